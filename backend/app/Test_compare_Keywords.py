@@ -1,9 +1,9 @@
 import os
-import json
 import re
-import io
-from google.cloud import vision
 import sys
+from .keyword_Matcher import compile_ban_list, fold_case, has_prefix_before, KeywordIndex, normalize_keyword_text
+from .rule_Registry import get_rule_set, RuleSet, EXCEPTION_KEYWORDS
+from .ocr_Layout import to_layout
 # print("버전:", torch.__version__)
 # print("GPU 사용 가능:", torch.cuda.is_available())
 # print("GPU 이름:", torch.cuda.get_device_name(0) if torch.cuda.is_available() else "N/A")
@@ -33,6 +33,11 @@ CAUTION_STATEMENT_KEYWORDS = [
 ]
 #####################################################
 
+# 위 키워드들을 미리 정규화/컴파일해 둔 인덱스 (블록마다 키워드를 다시 가공하지 않도록)
+ingredient_Start_Index = KeywordIndex(ingredient_Start_Keywords)
+ingredient_End_Index = KeywordIndex(ingredient_End_Keywords)
+CAUTION_STATEMENT_INDEX = KeywordIndex(CAUTION_STATEMENT_KEYWORDS, normalize=False)
+
 
 # exe 여부에 따라 base_dir 결정
 if getattr(sys, 'frozen', False):
@@ -49,31 +54,12 @@ data_dir = os.path.join(base_dir, "data")
 
 
 def ban_List(user_type='Vegan'):
-    if user_type == 'Vegan':
-        user_rules_path = os.path.abspath(os.path.join(data_dir, "strict_vegan_forbidden.json"))
-        # Strict Vegan Path
-    elif user_type == 'Pesco-vegetarian':
-        user_rules_path = os.path.abspath(os.path.join(data_dir, "pesco_forbidden.json"))
-        # pesco Path
-    elif user_type == "Lacto vegetarian":
-        return []
-    elif user_type == "Lacto-ovo vegetarian":
-        return []
-    elif user_type == "Ovo vegetarian":
-        return []
-    elif user_type == "Pollo-vegetarian":
-        return []
-    else:
-        return []
-
-    # 비건 불허 성분 키워드
-    with open(user_rules_path, "r", encoding="utf-8") as f:
-        USER_RULES = json.load(f)
-    
-    print(f"[DEBUG] Loaded {len(USER_RULES)} entries from {user_rules_path}")
-    print(f"[DEBUG] Sample entry: {USER_RULES[0] if USER_RULES else 'None'}")
-    # USER_RULES는 리스트이므로 바로 리턴
-    return USER_RULES
+    """
+    user_type 에 해당하는 금지 성분 규칙을 반환합니다.
+    - 파일은 워커당 한 번만 읽고 컴파일되며(rule_Registry), 이후 호출은 캐시된 RuleSet을 돌려줍니다.
+    - RuleSet은 리스트처럼 순회할 수 있고, 규칙 파일이 없는 유형은 빈 규칙입니다.
+    """
+    return get_rule_set(user_type)
 
 
 
@@ -84,57 +70,41 @@ def contains_keyword(text_content: str, keywords: list) -> bool:
     주어진 텍스트 내용(text_content)에 키워드 리스트(keywords) 중 하나라도 포함되어 있는지 판단합니다.
     - 텍스트와 키워드의 공백을 제거하고 모두 대문자로 변환하여 비교하므로, 대소문자나 띄어쓰기 오류에 강합니다.
     """
-    text_upper_no_space = text_content.upper().replace(" ", "")
+    text_upper_no_space = normalize_keyword_text(text_content)
     for keyword in keywords:
-        if keyword.upper().replace(" ", "") in text_upper_no_space:
+        if normalize_keyword_text(keyword) in text_upper_no_space:
             return True
     return False
 
 
-import re
-
 def check_forbidden_ingredients(text: str, ban_list: list[dict]) -> list[str]:
     """
     OCR로 추출된 전체 텍스트(text) 내에서 주어진 금지 키워드 리스트(ban_list)를 찾아 반환합니다.
     - 발견된 금지 성분들을 중복 없이 정렬된 리스트로 반환합니다.
     - 예외 키워드(식물성, 야채 등)가 앞에 있는 경우는 제외합니다.
+    - 규칙 목록은 Aho-Corasick 오토마톤으로 한 번만 컴파일되고, 텍스트는 한 번만 순회합니다.
     """
     if not text or not ban_list:
         return []
 
-    found_forbidden = set()
-    
-    # 예외 키워드 목록
-    exception_keywords = ['식물성', '야채', '채소', '콩'] # test
-    
-    for entry in ban_list:
-        keyword = entry.get("keyword", "")
-        
-        # 한국어 및 E-Code 키워드에 대해 반복
-        for kw in entry.get("korean", []) + entry.get("e_code", []):
-            if len(kw.strip()) < 2:
-                continue
-
-            # 원본 텍스트에서 키워드와 그 앞에 올 수 있는 예외 키워드 패턴을 함께 검색
-            # 예: "식물성유지"를 찾아 매칭시킵니다.
-            # '유지'만 찾는 것이 아니라, '식물성 유지' 같은 문구를 먼저 찾습니다.
-            exception_pattern = rf'({"|".join(exception_keywords)})\s*{re.escape(kw)}'
-            
-            # 예외 키워드가 앞에 있는 경우를 먼저 확인
-            if re.search(exception_pattern, text, re.IGNORECASE):
-                continue
-            
-            # 예외 키워드 조합이 아닌, 순수한 금지어만 검색
-            if re.search(re.escape(kw), text, re.IGNORECASE):
-                found_forbidden.add(keyword)
+    if isinstance(ban_list, RuleSet):
+        # 레지스트리에서 받은 규칙은 이미 컴파일되어 있음
+        return ban_list.find(text)
+
+    # 일반 리스트로 넘어온 규칙은 기본 예외 키워드로 컴파일
+    matcher = compile_ban_list(ban_list, EXCEPTION_KEYWORDS)
+    return matcher.find(text)
+
 
-    return sorted(list(found_forbidden))
+# 문장에서 성분 후보 단어를 뽑는 패턴
+_WORD_PATTERN = re.compile(r'[\w가-힣]+')
 
 
-def check_caution_ingredients(text: str, caution_keywords: list) -> list[str]:
+def check_caution_ingredients(text: str, caution_keywords: list, exception_prefixes=None) -> list[str]:
     """
     전체 텍스트에서 교차오염 관련 문구를 찾아, 해당 문장 내의 주의 성분(알레르기 유발물질 등)을 추출합니다.
-    예외 키워드가 앞에 있는 경우는 제외합니다.
+    예외 키워드가 바로 앞에 있는 경우는 제외합니다. (등장 위치마다 판단)
+    - exception_prefixes: 규칙 파일의 예외 접두어 (없으면 기본값 사용)
     """
     if not text or not caution_keywords:
         return []
@@ -142,7 +112,13 @@ def check_caution_ingredients(text: str, caution_keywords: list) -> list[str]:
     found_caution = set()
     
     # 예외 키워드 목록
-    exception_keywords = ['식물성', '야채', '채소', '콩']
+    exception_keywords = tuple(fold_case(p) for p in (exception_prefixes or EXCEPTION_KEYWORDS))
+
+    # 주의 문구 키워드 인덱스 (기본 목록이면 미리 컴파일된 것 사용)
+    if caution_keywords is CAUTION_STATEMENT_KEYWORDS:
+        caution_index = CAUTION_STATEMENT_INDEX
+    else:
+        caution_index = KeywordIndex(caution_keywords, normalize=False)
 
     # 텍스트를 문장 단위로 분리
     sentences = re.split(r'[.,\n]', text)
@@ -153,26 +129,22 @@ def check_caution_ingredients(text: str, caution_keywords: list) -> list[str]:
             continue
         
         # 교차오염 키워드가 포함된 문장인지 확인
-        if any(kw in sentence for kw in caution_keywords):
-            # 문장 내 모든 단어를 추출
-            ingredients_found = re.findall(r'[\w가-힣]+', sentence)
-            
+        if caution_index.contains(sentence):
             # 불필요한 키워드 제거
             exclude_words = {"제품", "제조시설", "혼입", "가능", "원료", "이력", "사용", "원재료", "성분"}
+            sentence_folded = fold_case(sentence)
             
-            for ing in ingredients_found:
-                if ing in exclude_words or len(ing) < 2:
+            # 문장 내 모든 단어를 위치와 함께 추출
+            for match in _WORD_PATTERN.finditer(sentence):
+                ing = match.group()
+                if ing in exclude_words or len(ing) < 2 or ing in found_caution:
                     continue
                 
-                # 추출된 성분 앞에 예외 키워드가 있는지 확인
-                is_exception = False
-                for ex_kw in exception_keywords:
-                    if re.search(rf'{re.escape(ex_kw)}\s*{re.escape(ing)}', sentence, re.IGNORECASE):
-                        is_exception = True
-                        break
+                # 이 위치의 성분 바로 앞에 예외 키워드가 있는지 확인
+                if has_prefix_before(sentence_folded, match.start(), exception_keywords):
+                    continue
                 
-                if not is_exception:
-                    found_caution.add(ing)
+                found_caution.add(ing)
 
     return sorted(list(found_caution))
 
@@ -188,10 +160,70 @@ def where_section(section='ing'):
         return
 
 
+def where_section_index(section='ing'):
+    """where_section 과 같지만, 미리 컴파일된 KeywordIndex 를 반환합니다."""
+    if (section == 'ing'):
+        return ingredient_Start_Index, ingredient_End_Index
+    if (section == 'fac'):
+        return
+
+
 def section_text(response, debug=True, section='ing'):
+    """
+    OCR 결과에서 섹션(기본: '원재료명') 텍스트를 추출합니다.
+    페이지가 없으면 '', 섹션을 찾지 못하면 None 을 반환합니다.
+    """
+    return _section_text(response, debug=debug, section=section)[0]
+
+
+# 규칙 기반 추출 결과를 '확실'하다고 볼 최소 길이 (정규화 후, 키워드만 잡힌 경우 제외)
+RULE_SECTION_MIN_CHARS = 8
+
+
+def section_text_with_confidence(response, section='ing'):
+    """
+    section_text 와 같은 추출을 하고 신뢰도(0.0 ~ 1.0)를 함께 반환합니다.
+    - 1.0: 시작 키워드와 종료 키워드를 모두 찾았고 내용이 충분함 (예: "원재료명 … 함유")
+    - 0.5: 시작 키워드만 찾음 (끝을 몰라 뒤쪽 텍스트가 섞였을 수 있음)
+    - 0.0: 섹션을 찾지 못함
+    """
+    text, found_end = _section_text(response, debug=False, section=section)
+    if not text:
+        return text, 0.0
+    if found_end and len(normalize_keyword_text(text)) >= RULE_SECTION_MIN_CHARS:
+        return text, 1.0
+    return text, 0.5
+
+
+# 주의 문구 문장 분리 (줄바꿈, 또는 마침표 뒤 공백)
+_CAUTION_SPLIT_PATTERN = re.compile(r'\n|(?<=\.)\s+')
+
+
+def caution_section_text(full_text: str) -> str:
+    """
+    전체 텍스트에서 교차오염/알레르기 주의 문구(CAUTION_STATEMENT_KEYWORDS)가 들어간 문장만 모아 반환합니다.
+    LLM 의 'caution_section_text' 를 규칙으로 대신할 때 사용합니다.
+    """
+    return split_caution_text(full_text)[1]
+
+
+def split_caution_text(full_text: str) -> tuple:
+    """텍스트를 (주의 문구가 아닌 문장들, 주의 문구 문장들) 로 나눕니다. 각각 줄바꿈으로 이어 붙임"""
+    if not full_text:
+        return "", ""
+    rest, caution = [], []
+    for line in _CAUTION_SPLIT_PATTERN.split(full_text):
+        line = line.strip()
+        if line:
+            (caution if CAUTION_STATEMENT_INDEX.contains(line) else rest).append(line)
+    return "\n".join(rest), "\n".join(caution)
+
+
+def _section_text(response, debug=True, section='ing'):
+    """section_text 본체. (추출 텍스트, 종료 키워드를 찾았는지) 를 반환합니다."""
     
-    start_kw, end_kw = where_section(section=section)
-    # 섹션의 시작과 끝을 판단할 키워드
+    start_idx, end_idx = where_section_index(section=section)
+    # 섹션의 시작과 끝을 판단할 키워드 인덱스 (정규화/컴파일 완료)
     
     ext_ing_sect_txts = []
     # extracted_ingredient_section_texts
@@ -201,32 +233,19 @@ def section_text(response, debug=True, section='ing'):
     # 현재 '원재료명' 섹션 안에 있는지 여부를 추적하는 플래그
     
     
-    # Google Vision API가 탐지한 페이지 내의 블록들을 순회합니다.
-    full = response.full_text_annotation
+    # Google Vision 응답(또는 이미 변환된 레이아웃)의 블록들을 순회합니다.
+    # 블록 텍스트는 OcrLayout 변환 시 한 번만 만들어집니다.
+    layout = to_layout(response)
     
-    # full이 None이거나 pages 속성이 없으면 빈 문자열 반환
-    if not full or not hasattr(full, "pages") or not full.pages:
-        return ''
-
-    # full이 존재하고 pages도 존재하는 경우
-    pages = full.pages
+    # 페이지가 없으면 빈 문자열 반환
+    if not layout.page_count:
+        return '', False
     
     
-    for page in pages:
-        for block_idx, block in enumerate(page.blocks):
-            # 현재 블록의 모든 텍스트를 합쳐 하나의 문자열로 만듭니다.
-            block_text = ""
-            for paragraph in block.paragraphs:
-                para_text = ""
-                for word in paragraph.words:
-                    word_text = ''.join([symbol.text for symbol in word.symbols])
-                    para_text += word_text
-                if para_text:
-                    block_text += para_text + " " # 단락 사이에 공백 추가
-                    
-                if debug:
-                    print(f"Block {block_idx} content: {block_text}")
-            block_text = block_text.strip() # 최종 공백 제거
+    for page_blocks in layout.iter_pages():
+        for block_idx, block_text in enumerate(page_blocks):
+            if debug:
+                print(f"Block {block_idx} content: {block_text}")
             
             
             # 빈 블록이나 매우 짧은 블록은 유효한 내용으로 간주하지 않습니다.
@@ -237,42 +256,29 @@ def section_text(response, debug=True, section='ing'):
                 # 짧은 블록도 포함할 수 있도록 함 (줄바꿈 등으로 인해 분리된 경우)
             
             
+            # 블록 텍스트는 여기서 한 번만 정규화(대문자 + 공백 제거)합니다.
+            block_txt_no_space = normalize_keyword_text(block_text)
+            
             # 1. 성분표 시작점 탐지 (아직 '원재료명' 섹션에 진입하지 않은 상태)
             if not in_ingredient_section:
-                if contains_keyword(block_text, start_kw):
+                # 시작 키워드 중 가장 앞에 나오는 위치 (없으면 -1)
+                start_idx_block = start_idx.first_index(block_txt_no_space)
+                if start_idx_block != -1:
                     in_ingredient_section = True # 성분표 섹션 진입 플래그를 True로 설정
                     
                     # 시작 키워드 이후부터 텍스트를 수집하여 정확한 시작점을 잡습니다.
                     # 예: "총 내용량 100g 원재료명: 설탕, 밀가루" 에서 "원재료명:" 이후부터 가져옴
-                    start_idx_block = -1
-                    block_txt_no_space = block_text.upper().replace(" ", "")
-                    
-                    for keyword in start_kw:
-                        keyword_upper_no_space = keyword.upper().replace(" ", "")
-                        if keyword_upper_no_space in block_txt_no_space:
-                            # 원본 블록 텍스트에서 해당 키워드의 시작 인덱스를 찾습니다.
-                            current_found_index = block_text.upper().replace(" ", "").find(keyword_upper_no_space)
-                            if start_idx_block == -1 or current_found_index < start_idx_block:
-                                start_idx_block = current_found_index
-                                
-                    if start_idx_block != -1:
-                        # 시작 키워드 이후부터 블록 텍스트를 잘라냅니다.
-                        sliced_block_text = block_text[start_idx_block:].strip()
-                        # 잘라낸 텍스트가 콜론으로 시작하면 콜론을 제거합니다.
-                        # (예: "원재료명:설탕" -> "설탕")
-                        if sliced_block_text.startswith(':'):
-                            sliced_block_text = sliced_block_text[1:].strip()
-                            
-                        ext_ing_sect_txts.append(sliced_block_text)
-                        # extracted_ingredient_section_texts
+                    sliced_block_text = block_text[start_idx_block:].strip()
+                    # 잘라낸 텍스트가 콜론으로 시작하면 콜론을 제거합니다.
+                    # (예: "원재료명:설탕" -> "설탕")
+                    if sliced_block_text.startswith(':'):
+                        sliced_block_text = sliced_block_text[1:].strip()
                         
-                    else: 
-                        # 시작 키워드를 찾았으나 슬라이싱 인덱스 문제 발생 시
-                        # 전체 블록 추가 (예외 처리)
-                        ext_ing_sect_txts.append(block_text)
+                    ext_ing_sect_txts.append(sliced_block_text)
+                    # extracted_ingredient_section_texts
                     
                     # (매우 드묾) 시작 블록에 이미 종료 키워드가 포함되어 있다면 즉시 섹션 종료
-                    if contains_keyword(ext_ing_sect_txts[-1], end_kw):
+                    if end_idx.contains(normalize_keyword_text(ext_ing_sect_txts[-1])):
                         in_ingredient_section = False
                         break # 현재 페이지의 블록 순회 종료
                     continue # 시작점을 찾았으니 다음 블록으로 이동하여 계속 수집
@@ -282,7 +288,7 @@ def section_text(response, debug=True, section='ing'):
             if in_ingredient_section:
                 # 현재 블록이 종료 키워드를 포함하는지 확인합니다.
                 # (이 키워드가 나오면 성분표 끝으로 판단)
-                if contains_keyword(block_text, end_kw):
+                if end_idx.contains(block_txt_no_space):
                     ext_ing_sect_txts.append(block_text)
                     # 종료 키워드가 있는 블록도 포함
                     
@@ -310,7 +316,7 @@ def section_text(response, debug=True, section='ing'):
         
         for i in range(len(lines) - 1, -1, -1): 
             # 마지막 줄부터 역순으로 탐색
-            if contains_keyword(lines[i], end_kw):
+            if end_idx.contains(normalize_keyword_text(lines[i])):
                 last_valid_line_idx = i 
                 # 종료 키워드가 포함된 줄의 인덱스 저장
                 break 
@@ -331,7 +337,9 @@ def section_text(response, debug=True, section='ing'):
             print("\n--- '원재료명'으로 추정되는 섹션에서 추출된 텍스트 ---")
             print(result_txt)
         
-        return result_txt
+        return result_txt, last_valid_line_idx != -1
+
+    return None, False
 
 ###################################################################################
 # --- process_image_with_google_vision_only 함수 (최종 수정) ---
@@ -342,11 +350,12 @@ def process_image_with_google_vision_only(response, user_type: str = "Vegan"):
     '원재료명' 섹션 정교하게 추출 및 비건 성분, 주의 성분 확인을 통합한 메인 함수입니다.
     """
     try:
-        full_text_from_image = response.full_text_annotation.text if response.full_text_annotation else ""
+        layout = to_layout(response)
+        full_text_from_image = layout.full_text
         print("\n[이미지에서 추출된 전체 텍스트 : \n", full_text_from_image)
 
         # section_text 함수를 사용하여 '원재료명' 섹션의 텍스트를 추출합니다.
-        final_refined_text = section_text(response, debug=False, section='ing')
+        final_refined_text = section_text(layout, debug=False, section='ing')
 
         if final_refined_text:
             # --- 비건 금지 성분 확인 ---
@@ -354,7 +363,8 @@ def process_image_with_google_vision_only(response, user_type: str = "Vegan"):
             found_forbidden = check_forbidden_ingredients(final_refined_text, test_ban_list)
             
             # --- 비건 주의 성분 확인 ---
-            found_caution = check_caution_ingredients(full_text_from_image, CAUTION_STATEMENT_KEYWORDS)
+            found_caution = check_caution_ingredients(full_text_from_image, CAUTION_STATEMENT_KEYWORDS,
+                                                      test_ban_list.exception_prefixes)
             
             print("\n--- 분석 결과 ---")
 
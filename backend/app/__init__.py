@@ -1,5 +1,26 @@
+import time as _time
+_import_started = _time.perf_counter()
+
 # from .compare_Keywords import ban_List, section_text, check_forbidden_ingredients
 from .Test_compare_Keywords import ban_List, section_text, process_image_with_google_vision_only
-from .llm_Analysis import process_image_with_llm
+from .llm_Analysis import (process_image_with_llm, process_image_with_llm_async,
+                           locate_sections_async, match_forbidden, match_caution,
+                           section_source_stats, llm_breaker_stats)
+from .llm_Cache import llm_cache_stats
+from .llm_Window import prompt_stats
+from .rule_Registry import registry_stats
+from .ocr_Cache import ocr_cache_stats
+from .veganLens import ocr_batch_stats
+from .batch_Matching import check_forbidden_batch, check_text
+from .ocr_Layout import OcrLayout, to_layout
 from .logger import get_logger,  get_logger_by_name
-from .choiceLogic import choice
\ No newline at end of file
+from .choiceLogic import choice, choice_async, register_ocr_backend
+from .startup_Report import record_import, import_report, peak_rss_mb
+from .request_Deadline import Deadline, DeadlineExceeded, DEADLINE_HEADER
+from .image_Preprocess import decode_for_ocr, decoded_bytes, PreparedImage
+from .image_Pool import prepare_upload_async, prepare_upload_pooled, image_pool_stats, ImageWorkerCrashed
+from .upload_Limit import UploadLimitMiddleware, MAX_UPLOAD_BYTES
+from .verdict_Cache import (verdict_key, verdict_etag, etag_matches,
+                            verdict_cache, verdict_flight, verdict_cache_stats)
+from .ingredient_Cache import lookup_ingredient_verdict, store_ingredient_verdict, ingredient_cache_stats
+record_import("app", _import_started)
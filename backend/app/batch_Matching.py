@@ -0,0 +1,88 @@
+# app/batch_Matching.py
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from .rule_Registry import get_rule_set
+from .Test_compare_Keywords import check_forbidden_ingredients, split_caution_text
+
+
+# ----------------------------
+# 여러 성분 텍스트 일괄 검사 (카탈로그 재검사용)
+# ----------------------------
+def _verdict(index: int, found_forbidden: list) -> dict:
+    return {
+        "index": index,
+        "is_vegan": len(found_forbidden) == 0,
+        "number_forbidden": len(found_forbidden),
+        "found_forbidden": found_forbidden,
+    }
+
+
+def _match_chunk(user_type: str, texts: list) -> list:
+    """
+    (프로세스 풀 워커에서 실행) 텍스트 묶음을 검사해 금지 성분 리스트들을 반환합니다.
+    규칙은 워커 프로세스마다 한 번만 로드/컴파일됩니다.
+    """
+    rule_set = get_rule_set(user_type)
+    return [rule_set.find(text) if text else [] for text in texts]
+
+
+def _chunks(texts, chunk_size: int):
+    it = iter(texts)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def check_forbidden_batch(texts, user_type: str = "Vegan", processes: int = 0, chunk_size: int = 256):
+    """
+    여러 성분 텍스트(리스트, 제너레이터, 파일 스트림 등)를 한 번에 검사해 항목별 판정을 순서대로 돌려주는 제너레이터.
+    - 모든 항목이 같은 컴파일된 규칙 인덱스(RuleSet)를 공유합니다.
+    - processes > 0 이면 프로세스 풀로 나눠 처리합니다. (묶음 단위 전송, 동시에 processes*2 묶음까지만 대기)
+    - 입력은 한꺼번에 메모리에 올리지 않고 chunk_size 씩 읽어 들입니다.
+
+    반환 항목 예: {"index": 0, "is_vegan": False, "number_forbidden": 1, "found_forbidden": ["milk"]}
+    """
+    if processes <= 0:
+        rule_set = get_rule_set(user_type)
+        for index, text in enumerate(texts):
+            yield _verdict(index, rule_set.find(text) if text else [])
+        return
+
+    index = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for chunk in _chunks(texts, chunk_size):
+            pending.append(pool.submit(_match_chunk, user_type, chunk))
+            if len(pending) < processes * 2:
+                continue
+            # 가장 오래된 묶음부터 결과를 내보내 입력 순서를 유지
+            for found in pending.popleft().result():
+                yield _verdict(index, found)
+                index += 1
+
+        while pending:
+            for found in pending.popleft().result():
+                yield _verdict(index, found)
+                index += 1
+
+
+# ----------------------------
+# 이미 가지고 있는 성분 텍스트로 판정 (OCR / LLM 없이 규칙만)
+# ----------------------------
+def check_text(ingredients_text: str, caution_text: str = None, user_type: str = "Vegan") -> tuple:
+    """
+    원재료 텍스트(+ 주의 문구 텍스트)로 (found_forbidden, found_caution) 을 반환합니다. /Check_Vegan 과 같은 기준:
+    - 금지 성분: 원재료 텍스트에서 규칙(RuleSet) 매칭
+    - 주의 성분: 주의 문구 텍스트에서 같은 규칙 매칭.
+      caution_text 가 없으면 원재료 텍스트 안의 교차오염/알레르기 문장을 떼어 내 주의 문구로 사용
+      (라벨 전체를 붙여 넣은 경우 "…와 같은 제조시설" 문장의 성분이 금지 성분으로 잡히지 않도록)
+    """
+    rule_set = get_rule_set(user_type)
+    if caution_text is None:
+        ingredients_text, caution_text = split_caution_text(ingredients_text or "")
+    found_forbidden = check_forbidden_ingredients(ingredients_text or "", rule_set)
+    found_caution = check_forbidden_ingredients(caution_text or "", rule_set)
+    return sorted(set(found_forbidden)), sorted(set(found_caution))
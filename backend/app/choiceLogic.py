@@ -1,11 +1,63 @@
-from .veganLens import extract_section
+import asyncio
+from .veganLens import extract_section, extract_section_async
+from .ocr_Replay import replay_ocr, replay_ocr_async
 # 이곳에 각자 만든 ocr 추출 함수 임포트 하기
 
-def choice(image, debug=True, base_filename=None, version = 1, what='google'):
-    if (what == 'google' and version == 1):
-        return extract_section  (image, 
-                                debug=debug, 
-                                base_filename=base_filename, 
-                                version=1)
-    else:
-        return print('다시 입력')
\ No newline at end of file
+
+# ----------------------------
+# OCR 백엔드 레지스트리
+# ----------------------------
+# (what, version) -> {"sync": 함수, "async": 코루틴 함수 또는 None}
+# 모든 백엔드 함수는 (image, debug, base_filename, version, source_size, deadline) 를 받고
+# Vision 응답(AnnotateImageResponse) 또는 실패 시 "" 를 반환합니다.
+# image 는 PIL Image 또는 이미 인코딩된 PreparedImage (image_Preprocess.ensure_prepared 로 둘 다 처리)
+OCR_BACKENDS = {}
+
+
+def register_ocr_backend(what: str, version: int = 1, sync=None, async_=None) -> None:
+    """새 OCR 엔진 등록. async_ 가 없으면 choice_async 는 sync 함수를 스레드에서 실행합니다."""
+    if sync is None and async_ is None:
+        raise ValueError("OCR 백엔드에는 sync 또는 async_ 함수가 필요합니다.")
+    OCR_BACKENDS[(what, version)] = {"sync": sync, "async": async_}
+
+
+def _get_backend(what: str, version: int) -> dict:
+    backend = OCR_BACKENDS.get((what, version))
+    if backend is None:
+        available = ", ".join(f"{w} v{v}" for w, v in sorted(OCR_BACKENDS))
+        raise ValueError(f"알 수 없는 OCR 백엔드: {what} v{version} (사용 가능: {available})")
+    return backend
+
+
+# Google Vision (동기 / 비동기 클라이언트)
+register_ocr_backend('google', 1, sync=extract_section, async_=extract_section_async)
+# 녹화된 Vision 응답 재생 (data/ocr_replay, 네트워크 호출 없음)
+register_ocr_backend('replay', 1, sync=replay_ocr, async_=replay_ocr_async)
+
+
+def choice(image, debug=True, base_filename=None, version = 1, what='google', source_size=None, deadline=None):
+    # source_size: 원본 업로드 바이트 수 (OCR 전처리 전/후 크기 로그용)
+    # deadline: 요청 시간 예산 (request_Deadline.Deadline, 없으면 제한 없음)
+    backend = _get_backend(what, version)
+    if backend["sync"] is None:
+        raise ValueError(f"OCR 백엔드 {what} v{version} 은 비동기 전용입니다. choice_async 를 사용하세요.")
+    return backend["sync"](image,
+                        debug=debug,
+                        base_filename=base_filename,
+                        version=version,
+                        source_size=source_size,
+                        deadline=deadline)
+
+
+async def choice_async(image, debug=True, base_filename=None, version = 1, what='google', source_size=None,
+                       deadline=None):
+    # choice 의 asyncio 버전 (비동기 구현이 없는 백엔드는 스레드에서 실행)
+    backend = _get_backend(what, version)
+    if backend["async"] is not None:
+        return await backend["async"](image,
+                                    debug=debug,
+                                    base_filename=base_filename,
+                                    version=version,
+                                    source_size=source_size,
+                                    deadline=deadline)
+    return await asyncio.to_thread(choice, image, debug, base_filename, version, what, source_size, deadline)
@@ -0,0 +1,120 @@
+# app/circuit_Breaker.py
+import time
+import threading
+from collections import deque
+
+
+class CircuitOpenError(RuntimeError):
+    """회로가 열려 있어 외부 호출을 하지 않고 바로 실패 처리할 때 발생"""
+
+
+# ----------------------------
+# 외부 서비스(LLM 등) 장애 시 호출을 끊어 주는 서킷 브레이커
+# ----------------------------
+class CircuitBreaker:
+    """
+    최근 호출 결과(성공/실패, 지연 시간)를 보고 호출을 막거나 허용합니다.
+    - closed: 정상. 최근 window 건 중 실패(느린 호출 포함) 비율이 failure_rate 이상이면 open
+    - open: 호출하지 않고 CircuitOpenError. reset_timeout 초가 지나면 half_open
+    - half_open: 시험 호출(probe) 1건만 허용. 성공하면 closed, 실패하면 다시 open
+    slow_call_s 보다 오래 걸린 호출은 성공했더라도 실패로 셉니다.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                slow_call_s: float = 10.0, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.rejected = 0           # open 상태라서 막은 호출 수
+        self.times_opened = 0
+        self.last_error = None
+        self._recent = deque(maxlen=window)    # [(실패 여부, 지연 시간)]
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지. half_open 에서는 probe 1건만 True"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        if latency >= self.slow_call_s:
+            self.record_failure(latency, f"slow call {latency:.1f}s")
+            return
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # probe 성공 -> 정상 복귀 (이전 실패 기록은 버림)
+                self.state = self.CLOSED
+                self._recent.clear()
+            self._probe_in_flight = False
+            self._recent.append((False, latency))
+
+    def record_failure(self, latency: float, error=None) -> None:
+        with self._lock:
+            self.last_error = str(error) if error is not None else None
+            self._probe_in_flight = False
+            self._recent.append((True, latency))
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            if self.state == self.CLOSED and len(self._recent) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._recent if failed)
+                if failures / len(self._recent) >= self.failure_rate:
+                    self._open()
+
+    def record_cancelled(self, latency: float) -> None:
+        """
+        호출한 쪽이 결과가 필요 없어져 취소함 (규칙 결과가 먼저 나왔거나 요청이 끊김).
+        지연과 상관없이 기록하지 않음. 기한을 넘겨 끊은 경우는 record_timeout 으로 따로 기록합니다.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_timeout(self, latency: float) -> None:
+        """호출한 쪽의 기한 안에 응답이 오지 않아 끊음. 지연과 상관없이 실패로 기록"""
+        self.record_failure(latency, f"deadline exceeded after {latency:.1f}s")
+
+    def _open(self) -> None:
+        # (lock 안에서 호출)
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        print(f"[CIRCUIT] {self.name} opened (last error: {self.last_error})")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = list(self._recent)
+            state = self.state
+            opened_for = time.monotonic() - self.opened_at if self.opened_at is not None and state != self.CLOSED else None
+        latencies = sorted(latency for _, latency in recent)
+        failures = sum(1 for failed, _ in recent if failed)
+        return {
+            "name": self.name,
+            "state": state,
+            "recent_calls": len(recent),
+            "recent_failures": failures,
+            "failure_rate": round(failures / len(recent), 3) if recent else 0.0,
+            "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "max_latency_s": round(latencies[-1], 3) if latencies else None,
+            "open_for_s": round(opened_for, 1) if opened_for is not None else None,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
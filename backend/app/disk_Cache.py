@@ -0,0 +1,177 @@
+# app/disk_Cache.py
+import os
+import time
+import sqlite3
+import threading
+
+
+# ----------------------------
+# SQLite 기반 디스크 캐시 (여러 uvicorn 워커가 같은 파일을 공유)
+# ----------------------------
+class DiskCache:
+    """
+    key(str) -> value(bytes) 디스크 캐시.
+    - 전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+    - ttl(초)을 주면 그보다 오래된 항목은 없는 것으로 취급
+    - WAL 모드라 여러 프로세스가 동시에 읽고 쓸 수 있고, 연결은 프로세스(fork 이후)마다 새로 엽니다.
+    - 본문을 가리키는 보조 테이블(index_tables)은 LRU 삭제 때 같은 트랜잭션에서 함께 지웁니다.
+    - 전체 크기는 {table}_meta 에 누적해 두므로 쓰기마다 SUM(size) 로 전체를 훑지 않습니다.
+    - hits / misses 는 현재 프로세스 기준 카운트입니다.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_bytes: int = 256 * 1024 * 1024, ttl: float = None,
+                 schema: tuple = (), index_tables: tuple = ()):
+        """
+        schema: 연결할 때 함께 실행할 DDL (같은 파일에 두는 보조 인덱스 테이블 등)
+        index_tables: key 컬럼으로 본문을 가리키는 보조 테이블. 본문이 LRU 로 지워질 때 같은 트랜잭션에서 함께 삭제
+        """
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.schema = tuple(schema)
+        self.index_tables = tuple(index_tables)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+
+    def connection(self) -> sqlite3.Connection:
+        """현재 프로세스 전용 연결 (fork 된 자식은 부모의 연결을 쓰지 않음)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table}(accessed)")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table}_meta ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            for statement in self.schema:
+                conn.execute(statement)
+            if conn.execute(f"SELECT 1 FROM {self.table}_meta").fetchone() is None:
+                # 누적 크기가 없는 파일(처음 만들었거나 이전 버전)은 한 번만 전체 합계로 시작
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {self.table}_meta (id, total) "
+                    f"SELECT 0, COALESCE(SUM(size), 0) FROM {self.table}"
+                )
+                conn.execute("COMMIT")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def query(self, sql: str, params: tuple = ()) -> list:
+        """같은 연결/잠금으로 보조 테이블을 조회하거나 수정 (본문 쓰기 트랜잭션과 섞이지 않음)"""
+        with self._lock:
+            return self.connection().execute(sql, params).fetchall()
+
+    def get(self, key: str, count: bool = True):
+        """count=False 면 hits / misses 에 집계하지 않음 (호출한 쪽에서 결과를 보고 직접 집계할 때)"""
+        with self._lock:
+            conn = self.connection()
+            row = conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if count:
+                    self.misses += 1
+                return None
+            conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            if count:
+                self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: bytes, related: tuple = ()) -> None:
+        """
+        related: 본문과 같은 트랜잭션에서 실행할 (sql, params) 목록 (보조 인덱스 행 쓰기 등)
+        쓰기와 LRU 삭제가 한 트랜잭션이라, 다른 워커가 보조 테이블만 남은 상태를 보지 않습니다.
+        """
+        with self._lock:
+            conn = self.connection()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                for sql, params in related:
+                    conn.execute(sql, params)
+                total = self._add_total(conn, len(value) - (old[0] if old else 0))
+                if total > self.max_bytes:
+                    self._evict(conn, total)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def delete(self, keys) -> int:
+        """keys 의 본문과 보조 테이블 행을 한 트랜잭션에서 삭제. 반환: 지운 본문 수"""
+        with self._lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed, size = 0, 0
+                for key in keys:
+                    row = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        removed += 1
+                        size += row[0]
+                self._delete_keys(conn, [(key,) for key in keys])
+                self._add_total(conn, -size)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return removed
+
+    def _add_total(self, conn: sqlite3.Connection, delta: int) -> int:
+        conn.execute(f"UPDATE {self.table}_meta SET total = total + ? WHERE id = 0", (delta,))
+        return conn.execute(f"SELECT total FROM {self.table}_meta WHERE id = 0").fetchone()[0]
+
+    def _delete_keys(self, conn: sqlite3.Connection, keys: list) -> None:
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", keys)
+        for index_table in self.index_tables:
+            conn.executemany(f"DELETE FROM {index_table} WHERE key = ?", keys)
+
+    def _evict(self, conn: sqlite3.Connection, total: int) -> None:
+        target = total
+        while target > self.max_bytes:
+            rows = conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY accessed LIMIT 32"
+            ).fetchall()
+            if not rows:
+                # 표가 비었음 (누적 크기가 어긋났던 경우 여기서 0으로 맞춤)
+                target = 0
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                target -= size
+                if target <= self.max_bytes:
+                    break
+            self._delete_keys(conn, evicted)
+        self._add_total(conn, target - total)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self.connection().execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,61 @@
+# app/fake_Vision.py
+import asyncio
+import time
+import hashlib
+from google.cloud import vision
+
+
+# ----------------------------
+# 테스트/부하 측정용 가짜 Vision 클라이언트 (네트워크 호출 없음)
+# ----------------------------
+def default_responder(content: bytes):
+    """이미지 해시가 들어간 간단한 원재료 텍스트를 돌려주는 기본 응답"""
+    response = vision.AnnotateImageResponse()
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    response.full_text_annotation.text = f"원재료명: 밀가루, 설탕, 우유 ({digest})\n알레르기 유발물질: 우유 함유"
+    return response
+
+
+class FakeVisionAsyncClient:
+    """
+    ImageAnnotatorAsyncClient 대신 쓰는 가짜 클라이언트.
+    - batch_annotate_images 만 구현 (OcrBatcher / google_ocr_async 가 쓰는 메서드)
+    - latency 초만큼 기다린 뒤 responder(content) 결과를 돌려줍니다.
+    - batch_sizes 에 호출마다 묶음 크기를 기록하므로 묶음 처리 여부를 확인할 수 있습니다.
+    """
+
+    def __init__(self, responder=None, latency: float = 0.05):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.batch_sizes = []
+
+    async def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        self.batch_sizes.append(len(requests))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return vision.BatchAnnotateImagesResponse(
+            responses=[self.responder(request.image.content) for request in requests]
+        )
+
+
+class FakeVisionClient:
+    """ImageAnnotatorClient 대신 쓰는 동기 가짜 클라이언트 (google_ocr 경로용)"""
+
+    def __init__(self, responder=None, latency: float = 0.05):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.batch_sizes = []
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        self.batch_sizes.append(len(requests))
+        if self.latency:
+            time.sleep(self.latency)
+        return vision.BatchAnnotateImagesResponse(
+            responses=[self.responder(request.image.content) for request in requests]
+        )
+
+    def document_text_detection(self, image, timeout=None, **kwargs):
+        self.batch_sizes.append(1)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(image.content)
@@ -0,0 +1,186 @@
+# app/image_Pool.py
+import os
+import time
+import hashlib
+import asyncio
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .image_Preprocess import prepare_upload
+
+
+# 호스트 전체에서 이미지 디코딩/재인코딩에 쓸 프로세스 수. 같은 호스트의 uvicorn 워커 수로 나눠 워커마다 풀 크기를 정함
+IMAGE_POOL_HOST_PROCESSES = int(os.getenv("IMAGE_POOL_HOST_PROCESSES", str(os.cpu_count() or 1)))
+# 같은 호스트의 uvicorn 워커 수 (Runner 는 UVICORN_WORKERS 를 자식에게 넘김, uvicorn CLI 를 직접 쓰면 WEB_CONCURRENCY)
+SERVER_WORKERS = max(1, int(os.getenv("UVICORN_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"))
+# uvicorn 워커 1개당 프로세스 수 (직접 주면 그 값). 기본값은 호스트 몫을 나눈 값이되 최소 1
+# (워커 수가 코어 수 이상이어도 워커마다 1개는 두어 디코딩이 이벤트 루프/GIL 을 막지 않도록)
+# IMAGE_POOL_WORKERS=0 이면 프로세스 풀 없이 스레드에서 처리
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", str(max(1, IMAGE_POOL_HOST_PROCESSES // SERVER_WORKERS))))
+# 풀에 동시에 넣어 둘 수 있는 최대 이미지 수 (실행 중 + 대기). 넘으면 자리가 날 때까지 기다림
+IMAGE_POOL_MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", str(max(1, IMAGE_POOL_WORKERS) * 2)))
+# 워커 프로세스가 죽은(BrokenProcessPool) 뒤 풀을 다시 만들기까지 기다리는 시간 (초, 죽을 때마다 2배)
+IMAGE_POOL_RETRY_S = float(os.getenv("IMAGE_POOL_RETRY_S", "10"))
+# 풀이 이 횟수만큼 죽으면 이 프로세스에서는 다시 만들지 않고 스레드에서만 처리
+IMAGE_POOL_MAX_FAILURES = int(os.getenv("IMAGE_POOL_MAX_FAILURES", "3"))
+
+_pool_state = {"pid": None, "pool": None, "failures": 0, "retry_at": 0.0}
+_pool_lock = threading.Lock()
+# 동기 호출용 (스레드 간 공유)
+_sync_slots = threading.BoundedSemaphore(IMAGE_POOL_MAX_PENDING)
+# 비동기 호출용 (이벤트 루프마다 하나)
+_async_slots = {"loop": None, "semaphore": None}
+_stats = {"submitted": 0, "in_thread": 0, "broken": 0, "rejected": 0, "busy_ms": 0.0, "wait_ms": 0.0}
+# 풀 워커가 죽었을 때 처리 중이던 업로드의 sha256 (재시도가 대기 시간 동안 서버 프로세스에서 디코딩되지 않도록)
+_CRASHED_KEEP = 256
+_crashed = {}
+
+
+class ImageWorkerCrashed(Exception):
+    """이 업로드를 처리하던 이미지 워커 프로세스가 죽었음 (서버 프로세스에서 다시 시도하지 않음)"""
+
+
+def _init_worker() -> None:
+    # (워커 프로세스 시작 시 1번) HEIC 열기 등록
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+
+
+def _prepare_in_worker(data: bytes):
+    started = time.perf_counter()
+    prepared = prepare_upload(data)
+    return prepared, (time.perf_counter() - started) * 1000
+
+
+def _get_pool():
+    """
+    프로세스마다 하나인 이미지 처리 풀 (처음 사용할 때 생성).
+    - spawn 방식: 이벤트 루프/스레드가 돌고 있는 uvicorn 워커를 fork 하지 않음 (Windows exe 와 같은 방식)
+    - fork 된 자식 프로세스에서는 부모의 풀을 쓰지 않고 새로 만듦
+    - 풀이 죽은 뒤 재시도 대기 중이거나 IMAGE_POOL_MAX_FAILURES 번 죽었으면 None (스레드에서 처리)
+    """
+    pid = os.getpid()
+    if _pool_state["pid"] == pid and _pool_state["pool"] is not None:
+        return _pool_state["pool"]
+    with _pool_lock:
+        if _pool_state["pid"] != pid:
+            _pool_state.update(pid=pid, pool=None, failures=0, retry_at=0.0)
+        if _pool_state["pool"] is None:
+            if _pool_state["failures"] >= IMAGE_POOL_MAX_FAILURES or time.monotonic() < _pool_state["retry_at"]:
+                return None
+            _pool_state["pool"] = ProcessPoolExecutor(
+                max_workers=IMAGE_POOL_WORKERS,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker,
+            )
+    return _pool_state["pool"]
+
+
+def _discard_pool(pool) -> None:
+    # 워커가 죽은 풀(BrokenProcessPool)은 버리고, 잠시 다른 요청은 스레드로 처리하다가 다시 만듦
+    # (시작하자마자 죽는 환경에서 요청마다 프로세스를 새로 띄우지 않도록)
+    with _pool_lock:
+        if _pool_state["pool"] is pool:
+            _pool_state["pool"] = None
+            _pool_state["failures"] += 1
+            failures = _pool_state["failures"]
+            if failures >= IMAGE_POOL_MAX_FAILURES:
+                print(f"[IMAGE_POOL] worker died {failures} times, preparing images in threads from now on")
+            else:
+                delay = IMAGE_POOL_RETRY_S * (2 ** (failures - 1))
+                _pool_state["retry_at"] = time.monotonic() + delay
+                print(f"[IMAGE_POOL] worker died, preparing in threads for {delay:g}s")
+            _stats["broken"] += 1
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _crashed_upload(data: bytes) -> ImageWorkerCrashed:
+    # 풀이 깨질 때 함께 실패한 요청은 어느 업로드가 원인인지 모르므로 모두 실패로 돌려주고 기억해 둠
+    if len(_crashed) >= _CRASHED_KEEP:
+        _crashed.pop(next(iter(_crashed)), None)
+    _crashed[hashlib.sha256(data).digest()] = True
+    return ImageWorkerCrashed("Image decoder process crashed while processing this upload")
+
+
+def _prepare_in_process(data: bytes):
+    """풀 없이(꺼져 있거나 재생성 대기 중) 현재 프로세스에서 처리. 워커를 죽였던 업로드는 거부"""
+    if _crashed and hashlib.sha256(data).digest() in _crashed:
+        _stats["rejected"] += 1
+        raise ImageWorkerCrashed("Image previously crashed the decoder process")
+    _stats["in_thread"] += 1
+    return prepare_upload(data)
+
+
+def _record(busy_ms: float, wait_ms: float) -> None:
+    _stats["submitted"] += 1
+    _stats["busy_ms"] += busy_ms
+    _stats["wait_ms"] += wait_ms
+
+
+# ----------------------------
+# 업로드 이미지 -> OCR 업로드용 바이트 (프로세스 풀)
+# ----------------------------
+def prepare_upload_pooled(data: bytes):
+    """
+    업로드 바이트를 프로세스 풀에서 디코딩/EXIF 보정/축소/재인코딩해 PreparedImage 로 돌려줍니다.
+    GIL 을 잡지 않으므로 큰 HEIC 를 처리하는 동안에도 같은 워커의 다른 요청이 멈추지 않습니다.
+    풀이 꺼져 있거나(IMAGE_POOL_WORKERS=0) 워커가 죽은 뒤 다시 만들기를 기다리는 중이면 현재 스레드에서 처리합니다.
+    처리 중에 워커가 죽으면 ImageWorkerCrashed (그 업로드는 서버 프로세스에서 다시 디코딩하지 않음)
+    """
+    if IMAGE_POOL_WORKERS > 0:
+        started = time.perf_counter()
+        with _sync_slots:
+            pool = _get_pool()
+            if pool is not None:
+                try:
+                    prepared, busy_ms = pool.submit(_prepare_in_worker, data).result()
+                except BrokenProcessPool:
+                    _discard_pool(pool)
+                    raise _crashed_upload(data) from None
+                _record(busy_ms, (time.perf_counter() - started) * 1000 - busy_ms)
+                return prepared
+    return _prepare_in_process(data)
+
+
+def _get_async_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if _async_slots["loop"] is not loop:
+        _async_slots["semaphore"] = asyncio.Semaphore(IMAGE_POOL_MAX_PENDING)
+        _async_slots["loop"] = loop
+    return _async_slots["semaphore"]
+
+
+async def prepare_upload_async(data: bytes):
+    """prepare_upload_pooled 의 asyncio 버전 (풀 결과를 기다리는 동안 이벤트 루프를 막지 않음)"""
+    if IMAGE_POOL_WORKERS > 0:
+        started = time.perf_counter()
+        async with _get_async_slots():
+            pool = _get_pool()
+            if pool is not None:
+                try:
+                    prepared, busy_ms = await asyncio.wrap_future(pool.submit(_prepare_in_worker, data))
+                except BrokenProcessPool:
+                    _discard_pool(pool)
+                    raise _crashed_upload(data) from None
+                _record(busy_ms, (time.perf_counter() - started) * 1000 - busy_ms)
+                return prepared
+    return await asyncio.to_thread(_prepare_in_process, data)
+
+
+def image_pool_stats() -> dict:
+    submitted = _stats["submitted"]
+    return {
+        "workers": IMAGE_POOL_WORKERS,
+        "server_workers": SERVER_WORKERS,
+        "max_pending": IMAGE_POOL_MAX_PENDING,
+        "started": _pool_state["pool"] is not None and _pool_state["pid"] == os.getpid(),
+        "disabled": _pool_state["failures"] >= IMAGE_POOL_MAX_FAILURES,
+        "submitted": submitted,
+        "in_thread": _stats["in_thread"],
+        "broken": _stats["broken"],
+        "rejected": _stats["rejected"],
+        # 워커에서 실제 처리한 시간 / 자리 대기 + 전송에 쓴 시간 (1장 평균, ms)
+        "avg_busy_ms": round(_stats["busy_ms"] / submitted, 1) if submitted else None,
+        "avg_wait_ms": round(_stats["wait_ms"] / submitted, 1) if submitted else None,
+    }
@@ -0,0 +1,174 @@
+# app/image_Preprocess.py
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from PIL import Image, ImageOps
+
+
+# ----------------------------
+# OCR 업로드 전 이미지 정규화 설정
+# ----------------------------
+@dataclass(frozen=True)
+class PreprocessConfig:
+    """
+    Vision 으로 보내기 전 이미지 가공 설정. 기본값은 환경변수로 바꿀 수 있습니다.
+    - max_long_edge : 긴 변 최대 픽셀 (넘으면 비율 유지 축소, 0이면 축소 안 함)
+    - grayscale     : 흑백 변환 여부 (글자 인식에는 색 정보가 거의 필요 없음)
+    - fmt           : "JPEG" 또는 "WEBP"
+    - quality       : 인코딩 품질 (1~100)
+    - draft_min_ratio : JPEG 축소 디코딩 시 긴 변이 max_long_edge 의 몇 배까지 작아져도 되는지
+                        (1/2 단위로만 줄일 수 있어 1.0 이면 4032px 사진도 원본 크기로 디코딩됨)
+    """
+    max_long_edge: int = int(os.getenv("OCR_MAX_LONG_EDGE", "2048"))
+    grayscale: bool = os.getenv("OCR_GRAYSCALE", "0") == "1"
+    fmt: str = os.getenv("OCR_IMAGE_FORMAT", "JPEG").upper()
+    quality: int = int(os.getenv("OCR_IMAGE_QUALITY", "85"))
+    draft_min_ratio: float = float(os.getenv("OCR_DRAFT_MIN_RATIO", "0.9"))
+
+
+DEFAULT_CONFIG = PreprocessConfig()
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """
+    이미 OCR 업로드용으로 인코딩된 이미지 (prepare_image 결과).
+    OCR 백엔드는 Image 대신 이것을 받으면 전처리 없이 content 를 그대로 보냅니다.
+    """
+    content: bytes
+    stats: dict
+
+
+def _to_ocr_mode(image: Image.Image, grayscale: bool) -> Image.Image:
+    """
+    JPEG/WEBP 로 저장 가능한 모드(RGB 또는 L)로 변환합니다.
+    - 투명 배경(RGBA, LA, 투명색이 있는 P)은 흰 배경 위에 합성 (PNG 스크린샷 대응)
+    """
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+
+    if grayscale:
+        return image if image.mode == "L" else image.convert("L")
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image
+
+
+def _downscale(image: Image.Image, max_long_edge: int) -> Image.Image:
+    """긴 변이 max_long_edge 를 넘으면 비율을 유지하며 축소 (글자 경계를 살리기 위해 LANCZOS 사용)"""
+    if max_long_edge <= 0:
+        return image
+    width, height = image.size
+    long_edge = max(width, height)
+    if long_edge <= max_long_edge:
+        return image
+    scale = max_long_edge / long_edge
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def decode_for_ocr(source, config: PreprocessConfig = None) -> Image.Image:
+    """
+    업로드 파일(경로, 파일 객체, bytes)을 OCR 에 필요한 해상도까지만 디코딩합니다.
+    - JPEG 은 draft 모드로 디코딩 단계에서 1/2, 1/4, 1/8 로 줄여 읽음 (긴 변이 max_long_edge * draft_min_ratio 보다 작아지지는 않음)
+      -> 4032x3024 사진을 2048 기준으로 읽으면 원본 픽셀 버퍼(약 36MB) 대신 2016x1512(약 9MB) 만 사용
+    - 흑백 설정이면 JPEG 의 밝기 채널만 디코딩
+    - 그 외 형식(PNG, HEIC 등)은 축소 디코딩을 지원하지 않아 원본 크기로 디코딩 (축소는 prepare_image 에서)
+    원본 픽셀 크기는 image.info["original_size"] 에 남겨 둡니다.
+    """
+    config = config or DEFAULT_CONFIG
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    image = Image.open(source)
+    original_size = image.size
+
+    if image.format == "JPEG" and config.max_long_edge > 0:
+        scale = config.max_long_edge * config.draft_min_ratio / max(original_size)
+        if scale < 1:
+            requested = (max(1, int(original_size[0] * scale)), max(1, int(original_size[1] * scale)))
+            image.draft("L" if config.grayscale else "RGB", requested)
+
+    image.load()
+    image.info["original_size"] = original_size
+    return image
+
+
+def decoded_bytes(image: Image.Image) -> int:
+    """디코딩된 픽셀 버퍼 크기 (바이트, 대략값)"""
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64비트 dHash. 같은 라벨을 조금 다르게 찍은 사진(압축률, 미세한 크기 차이)은 비슷한 값이 나옵니다.
+    9x8 흑백으로 줄인 뒤 가로로 이웃한 픽셀의 밝기 비교 결과를 비트로 이어 붙입니다.
+    """
+    small = image.convert("L").resize((9, 8), Image.BILINEAR, reducing_gap=2.0)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def prepare_image(image: Image.Image, config: PreprocessConfig = None, source_size: int = None):
+    """
+    OCR 업로드용 이미지 바이트를 만듭니다.
+    EXIF 회전 보정 -> 모드 변환 -> 축소 -> (흑백) -> JPEG/WEBP 인코딩
+    반환: (content bytes, stats dict)  ※ stats["phash"] 는 가공된 이미지의 perceptual_hash
+    - source_size: 원본 업로드 파일 크기. 없으면 디코딩된 픽셀 크기를 '변환 전 바이트'로 사용합니다.
+    - decode_for_ocr 로 축소 디코딩된 이미지면 size_before 는 원본 픽셀 크기
+    """
+    config = config or DEFAULT_CONFIG
+    size_before = image.info.get("original_size", image.size)
+    bytes_before = source_size if source_size is not None else decoded_bytes(image)
+
+    image = ImageOps.exif_transpose(image)
+    image = _to_ocr_mode(image, config.grayscale)
+    image = _downscale(image, config.max_long_edge)
+
+    buffer = BytesIO()
+    if config.fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=config.quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=config.quality)
+    content = buffer.getvalue()
+
+    stats = {
+        "bytes_before": bytes_before,
+        "bytes_after": len(content),
+        "size_before": size_before,
+        "size_after": image.size,
+        "format": config.fmt,
+        "phash": perceptual_hash(image),
+    }
+    return content, stats
+
+
+def ensure_prepared(image, source_size: int = None):
+    """PreparedImage 면 (content, stats) 를 그대로, PIL Image 면 prepare_image 결과를 반환"""
+    if isinstance(image, PreparedImage):
+        return image.content, image.stats
+    return prepare_image(image, source_size=source_size)
+
+
+def prepare_upload(data: bytes, config: PreprocessConfig = None) -> PreparedImage:
+    """
+    업로드 바이트 -> 디코딩(decode_for_ocr) -> prepare_image 까지 한 번에.
+    (image_Pool 의 워커 프로세스에서 실행) 반환 값은 인코딩된 바이트와 stats 뿐이라 프로세스 간 전송이 가볍습니다.
+    stats 에는 prepare_image 항목에 더해 size_decoded(축소 디코딩 크기), decoded_bytes(픽셀 버퍼 크기),
+    format_in(업로드 형식)이 들어갑니다.
+    """
+    image = decode_for_ocr(data, config)
+    size_decoded, pixel_bytes, format_in = image.size, decoded_bytes(image), image.format
+    content, stats = prepare_image(image, config, source_size=len(data))
+    stats["size_decoded"] = size_decoded
+    stats["decoded_bytes"] = pixel_bytes
+    stats["format_in"] = format_in
+    return PreparedImage(content, stats)
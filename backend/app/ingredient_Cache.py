@@ -0,0 +1,287 @@
+# app/ingredient_Cache.py
+import os
+import re
+import json
+import time
+import random
+import struct
+import hashlib
+import threading
+from array import array
+from .disk_Cache import DiskCache
+from .llm_Cache import data_dir
+from .rule_Registry import get_rule_set
+from .Test_compare_Keywords import section_text_with_confidence, caution_section_text
+
+
+# 성분 텍스트 판정 캐시 설정 (환경변수로 조정)
+INGREDIENT_CACHE_ENABLED = os.getenv("INGREDIENT_CACHE_ENABLED", "1") == "1"
+INGREDIENT_CACHE_PATH = os.getenv("INGREDIENT_CACHE_PATH", os.path.join(data_dir, "cache", "ingredient_cache.sqlite"))
+INGREDIENT_CACHE_MAX_ENTRIES = int(os.getenv("INGREDIENT_CACHE_MAX_ENTRIES", "500000"))
+# 추정 Jaccard 유사도가 이 값 이상이면 같은 제품으로 봄 (OCR 오타 2~3개 정도까지)
+INGREDIENT_SIMILARITY = float(os.getenv("INGREDIENT_SIMILARITY", "0.85"))
+# 정규화 후 이보다 짧은 텍스트는 캐시하지 않음 (몇 글자 차이로 성분이 달라짐)
+INGREDIENT_MIN_CHARS = int(os.getenv("INGREDIENT_MIN_CHARS", "20"))
+# LSH 후보 최대 개수 (흔한 문구로 버킷이 커져도 조회 시간이 일정하도록)
+INGREDIENT_MAX_CANDIDATES = int(os.getenv("INGREDIENT_MAX_CANDIDATES", "64"))
+
+# MinHash 설정: 64개 해시 = 8밴드 x 8행. 후보가 될 확률이 Jaccard 0.8 에서 약 0.8, 0.9 에서 약 0.99
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3
+_MERSENNE = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+# 워커 프로세스끼리 같은 서명을 만들도록 고정 시드
+_rng = random.Random(20240601)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+# ----------------------------
+# 텍스트 -> MinHash 서명
+# ----------------------------
+def normalize_ingredient_text(text: str) -> str:
+    """대문자 + 공백/문장부호 제거 (OCR 이 쉼표나 띄어쓰기를 다르게 읽어도 같은 텍스트가 되도록)"""
+    return _NON_WORD.sub("", (text or "").upper())
+
+
+def _shingle_hashes(normalized: str) -> set:
+    if len(normalized) <= SHINGLE:
+        grams = {normalized}
+    else:
+        grams = {normalized[i:i + SHINGLE] for i in range(len(normalized) - SHINGLE + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") & _MERSENNE
+            for g in grams}
+
+
+def minhash_signature(normalized: str) -> array:
+    """글자 3-gram 집합의 MinHash 서명 (32비트 x NUM_PERM)"""
+    hashes = _shingle_hashes(normalized)
+    return array("I", (min((a * h + b) % _MERSENNE for h in hashes) & _MASK32 for a, b in _PERMS))
+
+
+def _band_keys(signature: array, scope: str) -> tuple:
+    """
+    밴드(ROWS 개 해시)마다 하나의 64비트 키 (SQLite INTEGER 범위의 부호 있는 값)
+    scope(사용자 유형 + 규칙 버전)를 섞어 두어 밴드 인덱스 하나만으로 조회됩니다.
+    """
+    salt = scope.encode("utf-8")
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(salt + b"\0" + chunk, digest_size=8, person=bytes([band])).digest()
+        keys.append(struct.unpack("<q", digest)[0])
+    return tuple(keys)
+
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """두 서명으로 추정한 Jaccard 유사도"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _normalize_sections(sections: tuple) -> str:
+    # 섹션 경계는 남겨 둠 (원재료의 "우유"와 주의 문구의 "우유"는 다른 판정)
+    return "|".join(normalize_ingredient_text(text) for text in sections)
+
+
+def keyword_fingerprint(sections: tuple, user_type: str) -> list:
+    """섹션별로 규칙으로 찾은 금지 성분 키워드 목록 (Aho-Corasick 한 번씩, 1ms 미만)"""
+    rule_set = get_rule_set(user_type)
+    return [sorted(set(rule_set.find(text))) for text in sections]
+
+
+def ingredient_key_sections(layout) -> tuple:
+    """
+    캐시 키로 쓸 (원재료 섹션, 주의 문구 문장) = 규칙 기반 추출 결과 (LLM 없이 수 ms 안에 만들 수 있음)
+    원재료 섹션을 찾지 못하면 OCR 전체 텍스트를 사용합니다.
+    """
+    ingredients, _confidence = section_text_with_confidence(layout, section='ing')
+    return ingredients or layout.full_text, caution_section_text(layout.full_text)
+
+
+# ----------------------------
+# 성분 텍스트 기반 판정 캐시 (거의 같은 텍스트도 적중)
+# ----------------------------
+class IngredientCache:
+    """
+    (사용자 유형, 규칙 버전, (원재료 섹션, 주의 문구)) -> 판정 (found_forbidden, found_caution)
+    - 1차: 정규화된 텍스트의 sha256 이 같으면 적중
+    - 2차: MinHash LSH. 서명을 8밴드로 나눠 밴드별 인덱스에 넣고, 한 밴드라도 같은 항목을 후보로 가져와
+           추정 유사도가 threshold 이상인 가장 비슷한 항목을 사용 (인덱스 조회라 항목 수가 늘어도 빠름)
+      단, 섹션별로 규칙이 찾은 키워드 목록(keyword_fingerprint)이 저장된 것과 다르면 적중으로 보지 않음
+      (긴 원재료 목록에 "우유" 하나만 추가된 라벨도 3-gram 유사도는 0.9 를 넘기 때문)
+    판정 본문은 DiskCache(LRU) 에, 서명/밴드는 같은 SQLite 파일의 별도 테이블에 저장하며 여러 워커가 공유합니다.
+    서명 행은 본문과 같은 트랜잭션에서 쓰고, 본문이 LRU 로 지워지거나 규칙 버전이 바뀌면 함께 지워집니다.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS ingredient_minhash ("
+        "key TEXT PRIMARY KEY, scope TEXT NOT NULL, signature BLOB NOT NULL, "
+        f"{', '.join(f'b{band} INTEGER' for band in range(BANDS))})",
+        "CREATE INDEX IF NOT EXISTS ingredient_minhash_scope ON ingredient_minhash(scope)",
+        *(f"CREATE INDEX IF NOT EXISTS ingredient_minhash_b{band} ON ingredient_minhash(b{band})"
+          for band in range(BANDS)),
+    )
+
+    def __init__(self, path: str, max_entries: int, threshold: float = 0.85, max_candidates: int = 64):
+        # 판정 1건은 수백 바이트이므로 항목 수 한도를 바이트 한도로 환산
+        self.store = DiskCache(path, table="ingredient_verdict", max_bytes=max_entries * 512,
+                               schema=self.SCHEMA, index_tables=("ingredient_minhash",))
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.near_hits = 0
+        self.near_rejected = 0
+        self.skipped = 0
+        self.purged = 0
+        self._scopes = {}       # user_type -> 이 프로세스가 마지막으로 본 scope
+        self._lock = threading.Lock()
+
+    def _scope(self, user_type: str) -> str:
+        # 규칙 파일이 바뀌면 이전 판정은 다른 scope 가 되어 더 이상 적중하지 않음
+        scope = f"{user_type}:{get_rule_set(user_type).version}"
+        if self._scopes.get(user_type) != scope:
+            with self._lock:
+                if self._scopes.get(user_type) != scope:
+                    self._purge_other_scopes(user_type, scope)
+                    self._scopes[user_type] = scope
+        return scope
+
+    def _purge_other_scopes(self, user_type: str, scope: str, batch: int = 500) -> None:
+        """같은 사용자 유형의 다른 규칙 버전 판정/서명 삭제 (이 프로세스에서 새 버전을 처음 볼 때 한 번)"""
+        # "Vegan:" 로 시작하는 scope 범위 = ["Vegan:", "Vegan;")  (scope 인덱스로 조회)
+        low, high = f"{user_type}:", f"{user_type};"
+        while True:
+            keys = [key for (key,) in self.store.query(
+                "SELECT key FROM ingredient_minhash WHERE scope >= ? AND scope < ? AND scope != ? LIMIT ?",
+                (low, high, scope, batch))]
+            if not keys:
+                return
+            self.store.delete(keys)
+            self.purged += len(keys)
+
+    @staticmethod
+    def _key(scope: str, normalized: str) -> str:
+        return hashlib.sha256(f"{scope}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _near_key(self, scope: str, signature: array):
+        bands = _band_keys(signature, scope)
+        where = " OR ".join(f"b{band} = ?" for band in range(BANDS))
+        rows = self.store.query(
+            f"SELECT key, signature FROM ingredient_minhash WHERE {where} LIMIT ?",
+            (*bands, self.max_candidates),
+        )
+        best_key, best_score = None, self.threshold
+        for key, blob in rows:
+            score = similarity(signature, array("I", blob))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def lookup(self, sections: tuple, user_type: str):
+        """저장된 판정 dict (없으면 None). 반환 dict 에는 similarity(1.0 = 정확히 같은 텍스트)가 들어 있음"""
+        normalized = _normalize_sections(sections)
+        if len(normalized) < INGREDIENT_MIN_CHARS:
+            self.skipped += 1
+            return None
+        scope = self._scope(user_type)
+        blob = self.store.get(self._key(scope, normalized))
+        if blob is not None:
+            return dict(json.loads(blob.decode("utf-8")), similarity=1.0)
+
+        key, score = self._near_key(scope, minhash_signature(normalized))
+        if key is None:
+            return None
+        # 유사 후보 본문은 집계하지 않고 읽음 (앞선 정확 조회가 이미 miss 1건으로 집계됨)
+        blob = self.store.get(key, count=False)
+        if blob is None:
+            # 본문 없이 남은 서명 행 (이전 버전이 남긴 것) 정리
+            self.store.delete([key])
+            return None
+        value = json.loads(blob.decode("utf-8"))
+        if value.get("fingerprint") != keyword_fingerprint(sections, user_type):
+            # 성분이 실제로 다름: 정확 조회의 miss 그대로 둠
+            self.near_rejected += 1
+            return None
+        # 후보를 받아들였을 때만 앞선 정확 조회 miss 를 hit 로 바꿔 집계
+        self.store.misses -= 1
+        self.store.hits += 1
+        self.near_hits += 1
+        return dict(value, similarity=round(score, 3))
+
+    def store_verdict(self, sections: tuple, user_type: str, found_forbidden: list, found_caution: list) -> None:
+        normalized = _normalize_sections(sections)
+        if len(normalized) < INGREDIENT_MIN_CHARS:
+            return
+        scope = self._scope(user_type)
+        key = self._key(scope, normalized)
+        value = {"found_forbidden": found_forbidden, "found_caution": found_caution,
+                 "fingerprint": keyword_fingerprint(sections, user_type), "stored_at": time.time()}
+        signature = minhash_signature(normalized)
+        bands = _band_keys(signature, scope)
+        minhash_row = (
+            f"INSERT OR REPLACE INTO ingredient_minhash (key, scope, signature, "
+            f"{', '.join(f'b{band}' for band in range(BANDS))}) VALUES (?, ?, ?, {', '.join('?' * BANDS)})",
+            (key, scope, signature.tobytes(), *bands),
+        )
+        self.store.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), (minhash_row,))
+
+    def stats(self) -> dict:
+        stats = self.store.stats()
+        stats.update(near_hits=self.near_hits, near_rejected=self.near_rejected,
+                     skipped_short=self.skipped, purged_old_rules=self.purged, threshold=self.threshold)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ingredient_cache():
+    """성분 텍스트 캐시 (INGREDIENT_CACHE_ENABLED=0 이면 None)"""
+    global _cache
+    if not INGREDIENT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IngredientCache(INGREDIENT_CACHE_PATH, INGREDIENT_CACHE_MAX_ENTRIES,
+                                         INGREDIENT_SIMILARITY, INGREDIENT_MAX_CANDIDATES)
+    return _cache
+
+
+def lookup_ingredient_verdict(layout, user_type: str):
+    """
+    (스레드에서 실행) 레이아웃의 규칙 기반 섹션으로 저장된 판정을 찾습니다.
+    반환: (판정 dict 또는 None, 키 섹션)  키 섹션은 판정 후 store_ingredient_verdict 에 그대로 넘김
+    """
+    cache = get_ingredient_cache()
+    if cache is None:
+        return None, None
+    sections = ingredient_key_sections(layout)
+    try:
+        return cache.lookup(sections, user_type), sections
+    except Exception as e:
+        # 캐시 자체가 실패해도 판정은 그대로 진행
+        print(f"[INGREDIENT_CACHE] lookup failed: {type(e).__name__}: {e}")
+        return None, sections
+
+
+def store_ingredient_verdict(sections: tuple, user_type: str, found_forbidden: list, found_caution: list) -> None:
+    cache = get_ingredient_cache()
+    if cache is None or sections is None:
+        return
+    try:
+        cache.store_verdict(sections, user_type, found_forbidden, found_caution)
+    except Exception as e:
+        print(f"[INGREDIENT_CACHE] store failed: {type(e).__name__}: {e}")
+
+
+def ingredient_cache_stats() -> dict:
+    cache = get_ingredient_cache()
+    if cache is None:
+        return {"enabled": False}
+    stats = cache.stats()
+    stats["enabled"] = True
+    return stats
@@ -0,0 +1,201 @@
+# app/keyword_Matcher.py
+from collections import deque
+from functools import lru_cache
+
+
+# ----------------------------
+# 대소문자 무시 비교용 정규화
+# ----------------------------
+def fold_case(text: str) -> str:
+    """
+    re.IGNORECASE 와 같은 효과를 내기 위해 소문자로 바꿉니다.
+    - 글자 수가 바뀌는 문자(예: 'İ')는 그대로 두어, 결과 문자열의 인덱스가 원문과 1:1로 맞도록 합니다.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+
+class KeywordMatcher:
+    """
+    여러 키워드를 한 번에 찾는 Aho-Corasick 오토마톤.
+    - 키워드 목록으로 한 번만 만들어 두고, 텍스트는 한 번의 선형 순회로 모든 등장 위치를 찾습니다.
+    - 대소문자 처리 등 정규화는 호출하는 쪽에서 미리 해서 넘겨야 합니다.
+    """
+    __slots__ = ("patterns", "_goto", "_fail", "_out")
+
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self._goto = [{}]   # 상태별 전이 테이블
+        self._fail = [0]    # 실패 링크
+        self._out = [()]    # 상태에서 끝나는 패턴 번호들
+
+        # 1) 트라이 구성
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = self._out[state] + (idx,)
+
+        # 2) BFS로 실패 링크 연결 + 출력 병합
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str):
+        """
+        텍스트에서 모든 패턴의 등장 위치를 (start, end, 패턴 번호) 로 돌려줍니다. (겹치는 매칭 포함)
+        """
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for idx in out[state]:
+                    yield end - len(patterns[idx]), end, idx
+
+    def search(self, text: str) -> bool:
+        """패턴 중 하나라도 텍스트에 있으면 True"""
+        for _ in self.finditer(text):
+            return True
+        return False
+
+
+def has_prefix_before(text: str, pos: int, prefixes) -> bool:
+    """
+    text[pos] 앞쪽(공백은 건너뜀)이 예외 접두어(예: 식물성) 중 하나로 끝나는지 확인합니다.
+    정규식 r'(식물성|야채|...)\\s*<키워드>' 와 같은 판단을 위치 기반으로 수행합니다.
+    """
+    while pos > 0 and text[pos - 1].isspace():
+        pos -= 1
+    for prefix in prefixes:
+        if prefix and text.endswith(prefix, 0, pos):
+            return True
+    return False
+
+
+class ForbiddenMatcher:
+    """
+    금지 성분 JSON(ban_List) 전체를 하나의 오토마톤으로 컴파일한 객체.
+    - 한국어/E-Code 별칭을 모두 패턴으로 등록하고, 찾은 별칭을 영어 keyword로 되돌립니다.
+    """
+    __slots__ = ("exception_prefixes", "_matcher", "_alias_keywords")
+
+    def __init__(self, ban_list, exception_prefixes=()):
+        self.exception_prefixes = tuple(fold_case(p) for p in exception_prefixes if p)
+
+        alias_keywords = {}  # 정규화된 별칭 -> 영어 keyword 목록
+        for entry in ban_list:
+            keyword = entry.get("keyword", "")
+            for kw in list(entry.get("korean", [])) + list(entry.get("e_code", [])):
+                if len(kw.strip()) < 2:
+                    continue
+                keywords = alias_keywords.setdefault(fold_case(kw), [])
+                if keyword not in keywords:
+                    keywords.append(keyword)
+
+        self._alias_keywords = tuple(tuple(v) for v in alias_keywords.values())
+        self._matcher = KeywordMatcher(alias_keywords.keys())
+
+    def find(self, text: str) -> list[str]:
+        """
+        텍스트에서 금지 성분을 찾아 영어 keyword를 중복 없이 정렬해 반환합니다.
+        - 예외 접두어(식물성 등)는 매칭된 위치마다 따로 판단합니다.
+          예: "식물성유지, 유지" -> 앞의 '유지'는 제외, 뒤의 '유지'는 금지 성분으로 잡힘
+        """
+        if not text:
+            return []
+
+        folded = fold_case(text)
+        prefixes = self.exception_prefixes
+        seen = set()    # 예외 접두어 없이 한 번이라도 등장한 별칭
+        for start, _end, idx in self._matcher.finditer(folded):
+            if idx in seen:
+                continue
+            if prefixes and has_prefix_before(folded, start, prefixes):
+                continue
+            seen.add(idx)
+
+        found = set()
+        for idx in seen:
+            found.update(self._alias_keywords[idx])
+        return sorted(found)
+
+
+def _ban_list_fingerprint(ban_list) -> tuple:
+    return tuple(
+        (entry.get("keyword", ""), tuple(entry.get("korean", [])), tuple(entry.get("e_code", [])))
+        for entry in ban_list
+    )
+
+
+@lru_cache(maxsize=8)
+def _compile_fingerprint(fingerprint: tuple, exception_prefixes: tuple) -> ForbiddenMatcher:
+    entries = [{"keyword": k, "korean": ko, "e_code": e} for k, ko, e in fingerprint]
+    return ForbiddenMatcher(entries, exception_prefixes)
+
+
+def compile_ban_list(ban_list, exception_prefixes=()) -> ForbiddenMatcher:
+    """
+    같은 규칙 목록이면 이미 만들어 둔 오토마톤을 재사용합니다. (규칙 세트당 1회 컴파일)
+    """
+    return _compile_fingerprint(_ban_list_fingerprint(ban_list), tuple(exception_prefixes))
+
+
+# ----------------------------
+# 섹션 시작/종료/주의 문구 키워드 인덱스
+# ----------------------------
+def normalize_keyword_text(text: str) -> str:
+    """대문자로 바꾸고 공백을 제거 (contains_keyword 와 같은 비교 기준)"""
+    return text.upper().replace(" ", "")
+
+
+class KeywordIndex:
+    """
+    키워드 목록을 미리 정규화해서 하나의 오토마톤으로 컴파일해 둔 인덱스.
+    - normalize=True : 키워드/텍스트 모두 대문자 + 공백 제거 후 비교 (띄어쓰기/대소문자 오류에 강함)
+    - normalize=False: 원문 그대로 부분 문자열 비교
+    - contains()/first_index()에는 normalize()를 한 번 거친 텍스트를 넘깁니다.
+    """
+    __slots__ = ("keywords", "normalized", "_matcher")
+
+    def __init__(self, keywords, normalize: bool = True):
+        self.keywords = tuple(keywords)
+        self.normalized = normalize
+        self._matcher = KeywordMatcher(self.normalize(kw) for kw in self.keywords)
+
+    def normalize(self, text: str) -> str:
+        return normalize_keyword_text(text) if self.normalized else text
+
+    def contains(self, norm_text: str) -> bool:
+        return self._matcher.search(norm_text)
+
+    def first_index(self, norm_text: str) -> int:
+        """키워드가 처음 나오는 위치 (없으면 -1)"""
+        first = -1
+        for start, _end, _idx in self._matcher.finditer(norm_text):
+            if first == -1 or start < first:
+                first = start
+        return first
@@ -2,12 +2,21 @@
 import os
 import json
 import sys
+import time
+import asyncio
+import threading
 # 기존 로직 재사용: 금지어 로드/매칭/섹션 추출
 from .Test_compare_Keywords import (
     ban_List,                       # user_type -> JSON 로드
     check_forbidden_ingredients,    # 텍스트에서 금지어 찾아 "영어 keyword" 반환
-    section_text                    # (백업) 규칙기반 원재료 섹션 추출
+    section_text,                   # (백업) 규칙기반 원재료 섹션 추출
+    section_text_with_confidence,   # 규칙기반 원재료 섹션 + 신뢰도
+    caution_section_text,           # 규칙기반 주의 문구 블록
 )
+from .ocr_Layout import to_layout
+from .llm_Cache import section_cache
+from .llm_Window import window_text_for_llm
+from .circuit_Breaker import CircuitBreaker, CircuitOpenError
 
 # exe 여부에 따라 base_dir 결정
 if getattr(sys, 'frozen', False):
@@ -24,6 +33,54 @@ data_dir = os.path.join(base_dir, "data")
 key_path = os.path.join(data_dir, "openai_key.txt")
 
 
+# OpenAI 호출 정책 (환경변수로 조정)
+# - OPENAI_TIMEOUT_S: 요청 1회 전체 제한 시간, OPENAI_CONNECT_TIMEOUT_S: 연결(TCP/TLS) 제한 시간
+# - OPENAI_MAX_RETRIES: SDK 재시도 횟수 (연결 오류/429/5xx 만 재시도, 이것이 유일한 재시도 정책)
+# - OPENAI_MAX_CONNECTIONS / OPENAI_KEEPALIVE_S: 프로세스당 연결 풀 크기, keep-alive 유지 시간
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "20"))
+OPENAI_CONNECT_TIMEOUT_S = float(os.getenv("OPENAI_CONNECT_TIMEOUT_S", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+OPENAI_KEEPALIVE_S = float(os.getenv("OPENAI_KEEPALIVE_S", "60"))
+
+# 규칙 기반 섹션 추출과 LLM 을 동시에 시작해서 규칙 쪽이 확실하면 LLM 을 기다리지 않음
+# - LLM_SPECULATIVE: 1 이면 사용 (0 이면 항상 LLM 결과를 기다림)
+# - RULE_CONFIDENCE_MIN: 규칙 결과를 바로 쓰는 최소 신뢰도 (section_text_with_confidence 기준)
+# - LLM_DEADLINE_S: 규칙 결과가 불확실할 때 LLM 을 기다리는 최대 시간
+LLM_SPECULATIVE = os.getenv("LLM_SPECULATIVE", "1") == "1"
+RULE_CONFIDENCE_MIN = float(os.getenv("RULE_CONFIDENCE_MIN", "1.0"))
+LLM_DEADLINE_S = float(os.getenv("LLM_DEADLINE_S", "8"))
+# 요청 시간 예산(deadline)이 있을 때: 매칭 등 뒷단계용으로 남겨 둘 시간 / 이보다 적게 남으면 LLM 을 건너뜀
+LLM_RESERVE_S = float(os.getenv("LLM_RESERVE_S", "0.3"))
+LLM_MIN_BUDGET_S = float(os.getenv("LLM_MIN_BUDGET_S", "1.0"))
+
+# 섹션을 어디서 가져왔는지 집계
+# (rules: 규칙으로 바로 응답, llm: LLM 결과 사용, llm_timeout: 기한 초과, circuit_open: 회로 차단으로 규칙 사용,
+#  deadline_skip: 요청 예산이 부족해 LLM 을 부르지 않음)
+_section_sources = {"rules": 0, "llm": 0, "llm_timeout": 0, "llm_error": 0, "circuit_open": 0, "deadline_skip": 0}
+
+# OpenAI 장애/지연 시 호출을 끊는 서킷 브레이커 (환경변수로 조정)
+# - LLM_CB_WINDOW / LLM_CB_MIN_CALLS: 최근 몇 건을 볼지 / 최소 몇 건 이상일 때 판단할지
+# - LLM_CB_FAILURE_RATE: 이 비율 이상 실패(느린 호출 포함)하면 차단
+# - LLM_CB_SLOW_S: 이보다 오래 걸린 호출은 실패로 계산 (LLM_DEADLINE_S 보다 짧게)
+# - LLM_CB_RESET_S: 차단 후 이 시간이 지나면 시험 호출 1건 허용
+llm_breaker = CircuitBreaker(
+    "openai",
+    window=int(os.getenv("LLM_CB_WINDOW", "20")),
+    min_calls=int(os.getenv("LLM_CB_MIN_CALLS", "5")),
+    failure_rate=float(os.getenv("LLM_CB_FAILURE_RATE", "0.5")),
+    slow_call_s=float(os.getenv("LLM_CB_SLOW_S", "6")),
+    reset_timeout_s=float(os.getenv("LLM_CB_RESET_S", "30")),
+)
+
+# 동기 클라이언트는 프로세스(pid)마다 하나 (연결 풀/keep-alive 재사용, fork 된 워커는 새로 만듦)
+_openai_state = {"pid": None, "client": None, "api_key": None}
+_openai_lock = threading.Lock()
+
+# 비동기 클라이언트는 이벤트 루프에 묶이므로 루프별로 하나씩 만듭니다.
+_async_openai_state = {"loop": None, "client": None}
+
+
 # ----------------------------
 # OpenAI 키 로딩 & 호출 유틸
 # ----------------------------
@@ -40,109 +97,391 @@ def _read_openai_api_key() -> str:
                 return line
     raise RuntimeError("OpenAI API key not found. Set OPENAI_API_KEY or add data/openai_key.txt")
 
-def _call_openai_chat(messages, model: str = None) -> str:
+def _get_api_key() -> str:
+    """API 키는 프로세스당 한 번만 읽습니다."""
+    if _openai_state["api_key"] is None:
+        _openai_state["api_key"] = _read_openai_api_key()
+    return _openai_state["api_key"]
+
+def _resolve_model(model: str = None) -> str:
+    return model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+def _client_options() -> dict:
+    """동기/비동기 클라이언트 공통 설정 (명시적 timeout + 단일 재시도 정책)"""
+    import httpx
+    return {
+        "api_key": _get_api_key(),
+        "timeout": httpx.Timeout(OPENAI_TIMEOUT_S, connect=OPENAI_CONNECT_TIMEOUT_S),
+        "max_retries": OPENAI_MAX_RETRIES,
+    }
+
+def _pool_limits():
+    import httpx
+    return httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_S)
+
+def _reset_openai_clients() -> None:
+    """fork 직후 자식 프로세스에서 부모가 만든 클라이언트(연결 풀)를 버립니다."""
+    _openai_state.update(pid=None, client=None)
+    _async_openai_state.update(loop=None, client=None)
+
+
+if hasattr(os, "register_at_fork"):
+    # Windows 에는 fork 가 없어서 등록하지 않음
+    os.register_at_fork(after_in_child=_reset_openai_clients)
+
+
+def get_openai_client():
     """
-    OpenAI Chat API를 버전 차이에 안전하게 호출.
+    현재 프로세스용 동기 OpenAI 클라이언트 (처음 사용할 때 생성, 이후 연결 재사용).
+    openai<1.x 라서 OpenAI 클래스가 없으면 None (레거시 모듈 호출로 처리).
+    """
+    pid = os.getpid()
+    if _openai_state["pid"] == pid:
+        return _openai_state["client"]
+
+    with _openai_lock:
+        if _openai_state["pid"] != pid:
+            try:
+                from openai import OpenAI, DefaultHttpxClient
+            except ImportError:
+                client = None
+            else:
+                client = OpenAI(http_client=DefaultHttpxClient(limits=_pool_limits()), **_client_options())
+            _openai_state["client"] = client
+            _openai_state["pid"] = pid
+    return _openai_state["client"]
+
+def get_async_openai_client():
+    """현재 이벤트 루프용 AsyncOpenAI 클라이언트 (openai<1.x 면 None)"""
+    loop = asyncio.get_running_loop()
+    if _async_openai_state["loop"] is not loop:
+        try:
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        except ImportError:
+            client = None
+        else:
+            client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(limits=_pool_limits()), **_client_options())
+        _async_openai_state["client"] = client
+        _async_openai_state["loop"] = loop
+    return _async_openai_state["client"]
+
+def _call_openai_chat(messages, model: str = None, timeout: float = None) -> str:
+    """
+    OpenAI Chat API 호출 (프로세스 공용 클라이언트 사용).
     반환: assistant content(string, JSON 기대)
+    ※ 재시도는 SDK 의 max_retries(OPENAI_MAX_RETRIES) 한 곳에서만 합니다. 실패하면 그대로 예외.
+    ※ 서킷 브레이커가 열려 있으면 호출하지 않고 CircuitOpenError.
+    ※ timeout 을 주면 이 호출만 그 시간으로 제한 (요청 예산의 남은 시간), 없으면 OPENAI_TIMEOUT_S.
     """
-    api_key = _read_openai_api_key()
-    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    if not llm_breaker.allow():
+        raise CircuitOpenError("OpenAI circuit is open")
+    started = time.monotonic()
+    try:
+        content = _chat_completion(messages, model, timeout)
+    except Exception as e:
+        llm_breaker.record_failure(time.monotonic() - started, f"{type(e).__name__}: {e}")
+        raise
+    llm_breaker.record_success(time.monotonic() - started)
+    return content
 
-    # 신형(openai>=1.x) 클라이언트 우선
+async def _call_openai_chat_async(messages, model: str = None, timeout: float = None) -> str:
+    """_call_openai_chat 의 asyncio 버전 (요청 처리 중 스레드를 점유하지 않음)"""
+    if not llm_breaker.allow():
+        raise CircuitOpenError("OpenAI circuit is open")
+    started = time.monotonic()
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            response_format={"type": "json_object"},
-        )
-        return resp.choices[0].message.content
-    except Exception:
-        pass
-
-    # 레거시 백업
-    import openai as openai_legacy
-    openai_legacy.api_key = api_key
-    resp = openai_legacy.ChatCompletion.create(model=model, messages=messages)
-    return resp["choices"][0]["message"]["content"]
+        content = await _chat_completion_async(messages, model, timeout)
+    except asyncio.CancelledError:
+        # 규칙 결과가 먼저 나왔거나 기한이 지나 취소됨 (기한 초과는 취소한 쪽에서 record_timeout 으로 기록)
+        llm_breaker.record_cancelled(time.monotonic() - started)
+        raise
+    except Exception as e:
+        llm_breaker.record_failure(time.monotonic() - started, f"{type(e).__name__}: {e}")
+        raise
+    llm_breaker.record_success(time.monotonic() - started)
+    return content
+
+def _chat_completion(messages, model: str = None, timeout: float = None) -> str:
+    model = _resolve_model(model)
+    client = get_openai_client()
+
+    if client is None:
+        # 레거시(openai<1.x) SDK 만 설치된 환경
+        import openai as openai_legacy
+        openai_legacy.api_key = _get_api_key()
+        resp = openai_legacy.ChatCompletion.create(model=model, messages=messages,
+                                                   request_timeout=timeout or OPENAI_TIMEOUT_S)
+        return resp["choices"][0]["message"]["content"]
+
+    if timeout is not None:
+        # with_options 는 같은 연결 풀을 쓰는 복사본을 돌려줌
+        client = client.with_options(timeout=timeout)
+    resp = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_object"},
+    )
+    return resp.choices[0].message.content
+
+async def _chat_completion_async(messages, model: str = None, timeout: float = None) -> str:
+    model = _resolve_model(model)
+    client = get_async_openai_client()
+    if client is None:
+        return await asyncio.to_thread(_chat_completion, messages, model, timeout)
+    if timeout is not None:
+        client = client.with_options(timeout=timeout)
+
+    resp = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_object"},
+    )
+    return resp.choices[0].message.content
 
 # ----------------------------
 # LLM: 블록(섹션)만 찾아오기
 # ----------------------------
-def _locate_sections_with_llm(full_text: str) -> dict:
-    """
-    LLM에 '원재료 섹션'과 '알레르기/제조시설 주의 섹션'만 찾아 오도록 요청.
-    ※ 반환은 '텍스트 블록(원문 그대로)'만. 성분 매칭/영어 변환은 하지 않음.
-    """
-    if not full_text or not full_text.strip():
-        return {"ingredients_section_text": "", "caution_section_text": ""}
+_EMPTY_SECTIONS = {"ingredients_section_text": "", "caution_section_text": ""}
 
+def _section_messages(full_text: str) -> list:
+    # 전체 텍스트 대신 키워드 주변 창만 보냄 (LLM_TOKEN_BUDGET 이내, 창이 없으면 전체 텍스트)
+    ocr_text = window_text_for_llm(full_text)
     prompt = f"""
-아래 제품 라벨의 OCR 전체 텍스트에서 두 가지만 골라 **JSON** 으로 반환하세요.
+아래 제품 라벨의 OCR 텍스트에서 두 가지만 골라 **JSON** 으로 반환하세요.
 - 반드시 입력 텍스트의 **연속된 원문 문자열을 그대로** 발췌하세요(의역/생성 금지).
+- 텍스트가 '...' 줄로 나뉘어 있으면 서로 다른 발췌 구간입니다. 구간을 넘어 이어 붙이지 마세요.
 - 없으면 빈 문자열로 두세요.
 
 필수 키:
 "ingredients_section_text": '원재료명/성분' 목록으로 보이는 연속 블록(가능하면 한 블록)
 "caution_section_text": 알레르기 주의/같은 제조시설/교차오염 등 경고 문구 블록(가능하면 한 블록)
 
-[OCR FULL TEXT]
-{full_text}
+[OCR TEXT]
+{ocr_text}
 """.strip()
 
-    messages = [
+    return [
         {"role": "system",
         "content": "You extract text blocks only. Return a strict JSON object with the two required keys. Copy exact spans from the user text; do not invent terms."},
         {"role": "user", "content": prompt},
     ]
 
+def _parse_sections(content: str) -> dict:
+    data = json.loads(content)
+    # 보수 처리: 키 보장
+    return {
+        "ingredients_section_text": (data.get("ingredients_section_text") or "").strip(),
+        "caution_section_text": (data.get("caution_section_text") or "").strip(),
+    }
+
+def _locate_sections_with_llm(full_text: str, timeout: float = None):
+    """
+    LLM에 '원재료 섹션'과 '알레르기/제조시설 주의 섹션'만 찾아 오도록 요청.
+    ※ 반환은 '텍스트 블록(원문 그대로)'만. 성분 매칭/영어 변환은 하지 않음.
+    ※ 같은 라벨(공백 정규화한 전체 텍스트 + 모델명)은 캐시된 결과를 재사용 (llm_Cache)
+    반환: (sections, source)  실패 시 sections 는 None, source 는 circuit_open / llm_error
+    (호출한 쪽에서 규칙 기반 결과 사용)
+    """
+    if not full_text or not full_text.strip():
+        return dict(_EMPTY_SECTIONS), "llm"
+
+    model = _resolve_model()
+    cache_key = section_cache.make_key(full_text, model)
+    cached = section_cache.get(cache_key)
+    if cached is not None:
+        return cached, "llm"
+
+    try:
+        content = _call_openai_chat(_section_messages(full_text), model=model, timeout=timeout)
+        sections = _parse_sections(content)
+        # 정상 응답만 캐시 (실패 시 빈 블록은 저장하지 않음)
+        section_cache.set(cache_key, sections)
+        return sections, "llm"
+    except CircuitOpenError:
+        return None, "circuit_open"
+    except Exception as e:
+        print(f"[LLM] section extraction failed: {type(e).__name__}: {e}")
+        return None, "llm_error"
+
+async def _locate_sections_with_llm_async(full_text: str, timeout: float = None) -> dict:
+    """
+    _locate_sections_with_llm 의 asyncio 버전 (캐시 공유).
+    반환: (sections, source)  실패 시 sections 는 None, source 는 circuit_open / llm_error
+    (실패로 대체된 결과는 판정 캐시에 저장하지 않도록 호출한 쪽에서 구분)
+    """
+    if not full_text or not full_text.strip():
+        return dict(_EMPTY_SECTIONS), "llm"
+
+    model = _resolve_model()
+    cache_key = section_cache.make_key(full_text, model)
+    cached = section_cache.get(cache_key)
+    if cached is not None:
+        return cached, "llm"
+
     try:
-        content = _call_openai_chat(messages)
-        data = json.loads(content)
-        # 보수 처리: 키 보장
-        return {
-            "ingredients_section_text": (data.get("ingredients_section_text") or "").strip(),
-            "caution_section_text": (data.get("caution_section_text") or "").strip(),
-        }
-    except Exception:
-        # LLM 실패 시 빈 블록 반환
-        return {"ingredients_section_text": "", "caution_section_text": ""}
+        content = await _call_openai_chat_async(_section_messages(full_text), model=model, timeout=timeout)
+        sections = _parse_sections(content)
+        section_cache.set(cache_key, sections)
+        return sections, "llm"
+    except CircuitOpenError:
+        return None, "circuit_open"
+    except Exception as e:
+        print(f"[LLM] section extraction failed: {type(e).__name__}: {e}")
+        return None, "llm_error"
 
 # ----------------------------
 # 외부에 노출하는 엔트리
 # ----------------------------
-def process_image_with_llm(response, user_type: str = "Vegan"):
+def _rule_sections(layout, full_text: str):
+    """규칙 기반 섹션 + 신뢰도. 확실하지 않으면 (None, 신뢰도)"""
+    if not LLM_SPECULATIVE:
+        return None, 0.0
+    ing_txt, confidence = section_text_with_confidence(layout, section='ing')
+    if confidence < RULE_CONFIDENCE_MIN:
+        return None, confidence
+    return {"ingredients_section_text": ing_txt,
+            "caution_section_text": caution_section_text(full_text)}, confidence
+
+def _llm_budget(deadline, cap: float = None):
+    """
+    LLM 단계에 줄 시간 (초). 요청 예산이 없으면 cap 그대로.
+    남은 시간에서 뒷단계 몫(LLM_RESERVE_S)을 뺀 값이 LLM_MIN_BUDGET_S 보다 작으면 None (LLM 건너뜀)
+    """
+    if deadline is None:
+        return cap
+    budget = deadline.remaining() - LLM_RESERVE_S
+    if budget < LLM_MIN_BUDGET_S:
+        return None
+    return budget if cap is None else min(budget, cap)
+
+def _fallback_sections(full_text: str) -> dict:
+    """LLM 결과를 쓸 수 없을 때: 원재료는 _complete_sections 에서 section_text 로, 주의 문구는 규칙으로"""
+    return {"ingredients_section_text": "", "caution_section_text": caution_section_text(full_text)}
+
+def _complete_sections(layout, sections: dict) -> dict:
+    # (백업) LLM 이 원재료 섹션을 못 찾았으면 규칙 기반 원재료 섹션
+    if not sections.get("ingredients_section_text"):
+        sections = dict(sections, ingredients_section_text=section_text(layout, debug=False, section='ing') or "")
+    return sections
+
+def match_forbidden(sections: dict, user_type: str = "Vegan") -> list:
+    """원재료 섹션에서 금지 성분 매칭 (영어 keyword만 반환)"""
+    # 금지어 리스트 로드
+    rules = ban_List(user_type=user_type)  # JSON 파일 로드 (user_type 분기) 
+    # -> 내부에서 data/strict_vegan_forbidden.json 등 읽음
+    # -> 리스트 항목의 "keyword"(영어)가 반환에 쓰이게 됨
+    return sorted(set(check_forbidden_ingredients(sections.get("ingredients_section_text", ""), rules)))
+
+def match_caution(sections: dict, user_type: str = "Vegan", deadline=None) -> list:
+    """주의 문구 블록에서 금지 성분 매칭. 요청 예산을 이미 다 썼으면 건너뜀 (금지 성분 판정은 항상 수행)"""
+    if deadline is not None and deadline.expired():
+        deadline.degrade("caution_skipped")
+        return []
+    rules = ban_List(user_type=user_type)
+    return sorted(set(check_forbidden_ingredients(sections.get("caution_section_text", ""), rules)))
+
+def _match_sections(layout, sections: dict, user_type: str, deadline=None):
+    sections = _complete_sections(layout, sections)
+    return match_forbidden(sections, user_type), match_caution(sections, user_type, deadline)
+
+def process_image_with_llm(response, user_type: str = "Vegan", deadline=None):
     """
     기존 시그니처 유지: Google Vision response + user_type -> (found_forbidden, found_caution)
-    - LLM은 섹션 위치만 추출
+    - response 자리에는 이미 변환된 OcrLayout 을 넘겨도 됩니다.
+    - 규칙 기반 섹션 추출이 확실하면(시작/종료 키워드 모두 발견) LLM 을 부르지 않음
+    - 그 외에는 LLM은 섹션 위치만 추출
     - 금지 성분 탐지는 반드시 JSON 사전(ban_List) 기반으로 수행
     - 프론트로는 영어 keyword만 반환
+    - deadline(요청 시간 예산)이 있으면 LLM 은 남은 시간만 쓰고, 부족하면 건너뜀 (deadline 에 사유 기록)
     """
-    # 0) OCR 전체 텍스트
-    full_text = ""
-    if getattr(response, "full_text_annotation", None):
-        full_text = response.full_text_annotation.text or ""
+    # OCR 전체 텍스트 (Vision 응답이면 여기서 한 번만 레이아웃으로 변환)
+    layout = to_layout(response)
+    full_text = layout.full_text
     if not full_text.strip():
         return [], []
 
-    # 1) LLM으로 섹션만 찾기
-    sections = _locate_sections_with_llm(full_text)
-    ing_txt = sections.get("ingredients_section_text", "")
-    caution_txt = sections.get("caution_section_text", "")
+    # 규칙 기반 결과가 확실하면 바로 사용 (규칙 추출은 수 ms 라 LLM 보다 먼저 해 봄)
+    sections, confidence = _rule_sections(layout, full_text)
+    if sections is not None:
+        _section_sources["rules"] += 1
+        return _match_sections(layout, sections, user_type, deadline)
 
-    # 2) (백업) 규칙 기반 원재료 섹션
-    if not ing_txt:
-        ing_txt = section_text(response, debug=False, section='ing') or ""
+    llm_timeout = _llm_budget(deadline)
+    if deadline is not None and llm_timeout is None:
+        deadline.degrade("llm_skipped")
+        _section_sources["deadline_skip"] += 1
+        return _match_sections(layout, _fallback_sections(full_text), user_type, deadline)
 
-    # 3) 금지어 리스트 로드
-    rules = ban_List(user_type=user_type)  # JSON 파일 로드 (user_type 분기) 
-    # -> 내부에서 data/strict_vegan_forbidden.json 등 읽음
-    # -> 리스트 항목의 "keyword"(영어)가 반환에 쓰이게 됨
+    # LLM으로 섹션만 찾기 (회로가 열려 있거나 호출이 실패하면 규칙 기반)
+    sections, source = _locate_sections_with_llm(full_text, timeout=llm_timeout)
+    if sections is None:
+        sections = _fallback_sections(full_text)
+    _section_sources[source] += 1
+    return _match_sections(layout, sections, user_type, deadline)
+
+async def locate_sections_async(layout, deadline=None):
+    """
+    원재료 / 주의 문구 섹션 찾기 (asyncio).
+    LLM 요청과 규칙 기반 추출을 동시에 시작하고, 규칙 쪽이 확실하면 LLM 을 취소합니다.
+    (규칙 추출은 스레드에서 실행되므로 그동안 이벤트 루프가 LLM 요청을 실제로 보냅니다)
+    불확실하면 LLM 을 LLM_DEADLINE_S (요청 예산이 있으면 남은 시간과 비교해 짧은 쪽) 까지만 기다리고,
+    넘으면 규칙 기반 결과로 대체합니다.
+    반환: (sections, source)  source: rules / llm / llm_timeout / llm_error / circuit_open / deadline_skip
+    """
+    full_text = layout.full_text
+    llm_timeout = _llm_budget(deadline, LLM_DEADLINE_S)
+    llm_task = None
+    if llm_timeout is not None:
+        llm_task = asyncio.ensure_future(_locate_sections_with_llm_async(full_text, timeout=llm_timeout))
+        llm_started = time.monotonic()
+    try:
+        sections, confidence = await asyncio.to_thread(_rule_sections, layout, full_text)
+    except BaseException:
+        # 요청이 취소되면 LLM 호출도 함께 정리
+        if llm_task is not None:
+            llm_task.cancel()
+        raise
+    if sections is not None:
+        if llm_task is not None:
+            llm_task.cancel()
+        source = "rules"
+    elif llm_task is None:
+        # 요청 예산이 부족해 LLM 을 시작하지 않음
+        deadline.degrade("llm_skipped")
+        sections, source = _fallback_sections(full_text), "deadline_skip"
+    else:
+        try:
+            # 기한은 LLM 요청을 시작한 시점부터 (SDK 의 요청 타임아웃/재시도보다 먼저 끊음)
+            remaining = max(0.0, llm_timeout - (time.monotonic() - llm_started))
+            sections, source = await asyncio.wait_for(llm_task, timeout=remaining)
+        except asyncio.TimeoutError:
+            print(f"[LLM] deadline {llm_timeout:.2f}s exceeded, using rule-based sections (confidence {confidence})")
+            # (wait_for 는 LLM 작업의 취소가 끝난 뒤 돌아오므로 record_cancelled 다음에 실패로 기록됨)
+            llm_breaker.record_timeout(time.monotonic() - llm_started)
+            sections, source = None, "llm_timeout"
+            if deadline is not None:
+                deadline.degrade("llm_deadline")
+        if sections is None:
+            sections = _fallback_sections(full_text)
+
+    _section_sources[source] += 1
+    return _complete_sections(layout, sections), source
+
+async def process_image_with_llm_async(response, user_type: str = "Vegan", deadline=None):
+    """process_image_with_llm 의 asyncio 버전 (요청 핸들러에서 사용, 섹션 찾기는 locate_sections_async)"""
+    layout = to_layout(response)
+    if not layout.full_text.strip():
+        return [], []
+
+    sections, _source = await locate_sections_async(layout, deadline)
+    return match_forbidden(sections, user_type), match_caution(sections, user_type, deadline)
 
-    # 4) 매칭 (영어 keyword만 반환됨)
-    found_forbidden = check_forbidden_ingredients(ing_txt, rules)
-    found_caution   = check_forbidden_ingredients(caution_txt, rules)
+def llm_breaker_stats() -> dict:
+    return llm_breaker.snapshot()
 
-    # 5) 정리 후 리턴
-    return sorted(set(found_forbidden)), sorted(set(found_caution))
+def section_source_stats() -> dict:
+    """섹션 추출 경로별 처리 건수 (규칙으로 바로 응답한 비율 확인용)"""
+    total = sum(_section_sources.values())
+    return dict(_section_sources, rules_rate=round(_section_sources["rules"] / total, 3) if total else 0.0)
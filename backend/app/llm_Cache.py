@@ -0,0 +1,109 @@
+# app/llm_Cache.py
+import os
+import sys
+import json
+import hashlib
+import threading
+from cachetools import TTLCache
+from .disk_Cache import DiskCache
+
+
+# exe 여부에 따라 base_dir 결정
+if getattr(sys, 'frozen', False):
+    # exe 실행 시: exe가 있는 폴더 기준
+    base_dir = os.path.dirname(sys.executable)
+else:
+    # 개발 환경: 이 파일이 있는 폴더 기준
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+# data 폴더 경로
+data_dir = os.path.join(base_dir, "data")
+
+# 캐시 설정 (환경변수로 조정)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))          # 메모리 항목 수 (0이면 끔)
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "86400"))     # 유효 시간 (초)
+LLM_CACHE_DISK = os.getenv("LLM_CACHE_DISK", "0") == "1"            # 디스크 계층 사용 여부
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(data_dir, "cache", "llm_cache.sqlite"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "64"))
+
+
+# ----------------------------
+# LLM 섹션 추출 결과 캐시 (메모리 LRU + 선택적 디스크)
+# ----------------------------
+class SectionCache:
+    """
+    (공백 정규화된 OCR 전체 텍스트, 모델명) -> LLM 이 찾아 준 섹션 텍스트 dict
+    - 1차: 프로세스 메모리 TTL/LRU
+    - 2차: (선택) 여러 워커가 공유하는 SQLite 디스크 캐시
+    """
+
+    def __init__(self, maxsize: int, ttl: float, disk: DiskCache = None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl) if maxsize > 0 else None
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(full_text: str, model: str) -> str:
+        normalized = " ".join(full_text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        if self.memory is not None:
+            with self._lock:
+                value = self.memory.get(key)
+                if value is not None:
+                    self.memory_hits += 1
+                    return dict(value)
+
+        if self.disk is not None:
+            try:
+                blob = self.disk.get(key)
+            except Exception:
+                blob = None
+            if blob is not None:
+                value = json.loads(blob.decode("utf-8"))
+                with self._lock:
+                    self.disk_hits += 1
+                    if self.memory is not None:
+                        self.memory[key] = value
+                return dict(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        if self.memory is not None:
+            with self._lock:
+                self.memory[key] = dict(value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_entries": len(self.memory) if self.memory is not None else 0,
+            "memory_maxsize": self.memory.maxsize if self.memory is not None else 0,
+            "disk_enabled": self.disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_disk = DiskCache(LLM_CACHE_PATH, table="llm_sections", max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                ttl=LLM_CACHE_TTL_S) if LLM_CACHE_DISK else None
+section_cache = SectionCache(LLM_CACHE_SIZE, LLM_CACHE_TTL_S, _disk)
+
+
+def llm_cache_stats() -> dict:
+    return section_cache.stats()
@@ -0,0 +1,172 @@
+# app/llm_Window.py
+import os
+import threading
+from .keyword_Matcher import KeywordMatcher, fold_case
+from .logger import get_logger_by_name
+from .Test_compare_Keywords import (
+    ingredient_Start_Keywords,      # 원재료 섹션 시작 단서
+    ingredient_End_Keywords,        # 원재료 섹션 종료 단서
+    CAUTION_STATEMENT_KEYWORDS,     # 교차오염/알레르기 주의 문구 단서
+)
+
+
+# LLM 에 보낼 텍스트 자르기 설정 (환경변수로 조정)
+# - LLM_TOKEN_BUDGET: 프롬프트에 넣을 OCR 텍스트의 최대 토큰 수 (추정치, 0이면 자르지 않음)
+# - LLM_WINDOW_MARGIN: 키워드 앞뒤로 함께 보낼 글자 수
+# - LLM_WINDOW_MAX_CHARS: 종료 키워드를 못 찾았을 때 원재료 창의 최대 길이
+# - LLM_CAUTION_SPAN: 주의 문구 키워드 뒤로 포함할 글자 수
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", "1500"))
+LLM_WINDOW_MARGIN = int(os.getenv("LLM_WINDOW_MARGIN", "80"))
+LLM_WINDOW_MAX_CHARS = int(os.getenv("LLM_WINDOW_MAX_CHARS", "1500"))
+LLM_CAUTION_SPAN = int(os.getenv("LLM_CAUTION_SPAN", "200"))
+
+# 창 사이에 넣는 구분자 (LLM 이 창을 이어 붙여 발췌하지 않도록)
+WINDOW_SEPARATOR = "\n...\n"
+
+_START, _END, _CAUTION = 0, 1, 2
+
+logger = get_logger_by_name("google")
+
+
+def _keyword_patterns():
+    # 띄어쓰기가 있는 키워드는 OCR 에서 붙어 나오는 경우도 있어 공백 없는 형태도 함께 등록
+    patterns, kinds = [], []
+    for kind, keywords in ((_START, ingredient_Start_Keywords),
+                           (_END, ingredient_End_Keywords),
+                           (_CAUTION, CAUTION_STATEMENT_KEYWORDS)):
+        for keyword in keywords:
+            folded = fold_case(keyword)
+            for variant in {folded, folded.replace(" ", "")}:
+                patterns.append(variant)
+                kinds.append(kind)
+    return patterns, kinds
+
+
+_patterns, _pattern_kinds = _keyword_patterns()
+_matcher = KeywordMatcher(_patterns)
+
+# 요청별 프롬프트 크기 집계
+_prompt_stats = {"requests": 0, "windowed": 0, "full_text": 0, "tokens_full": 0, "tokens_sent": 0}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 쓰는 토큰 수 추정치.
+    영문/숫자(ASCII)는 약 4글자당 1토큰, 한글 등 비ASCII 글자는 1글자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+def _snap(text: str, start: int, end: int) -> tuple:
+    """창 경계를 줄 단위로 맞춤 (단, 한쪽으로 LLM_WINDOW_MARGIN 이상 늘리지는 않음)"""
+    line_start = text.rfind("\n", 0, start) + 1
+    if start - line_start <= LLM_WINDOW_MARGIN:
+        start = line_start
+    line_end = text.find("\n", end)
+    if line_end == -1:
+        line_end = len(text)
+    if line_end - end <= LLM_WINDOW_MARGIN:
+        end = line_end
+    return start, end
+
+
+def find_windows(full_text: str) -> list:
+    """
+    시작/종료/주의 키워드 위치로 섹션 후보 구간을 찾습니다.
+    반환: [(start, end, priority)] 원문 인덱스 기준, 겹치는 구간은 합쳐져 있음 (priority 0: 원재료, 1: 주의 문구)
+    """
+    if not full_text:
+        return []
+
+    folded = fold_case(full_text)
+    hits = sorted(_matcher.finditer(folded))
+    end_positions = [end for _, end, idx in hits if _pattern_kinds[idx] == _END]
+
+    windows = []
+    for start, end, idx in hits:
+        kind = _pattern_kinds[idx]
+        if kind == _START:
+            # 시작 키워드 이후 처음 나오는 종료 키워드까지 (없으면 최대 길이까지)
+            stop = next((pos for pos in end_positions if pos > end), None)
+            if stop is None or stop - start > LLM_WINDOW_MAX_CHARS:
+                stop = start + LLM_WINDOW_MAX_CHARS
+            windows.append((start - LLM_WINDOW_MARGIN, stop + LLM_WINDOW_MARGIN, 0))
+        elif kind == _CAUTION:
+            windows.append((start - LLM_WINDOW_MARGIN, end + LLM_CAUTION_SPAN, 1))
+
+    # 텍스트 범위로 자르고 줄 단위로 맞춘 뒤, 겹치는 구간 합치기
+    merged = []
+    for start, end, priority in sorted(windows):
+        start, end = _snap(full_text, max(0, start), min(len(full_text), end))
+        if merged and start <= merged[-1][1]:
+            prev_start, prev_end, prev_priority = merged[-1]
+            merged[-1] = (prev_start, max(prev_end, end), min(prev_priority, priority))
+        else:
+            merged.append((start, end, priority))
+    return merged
+
+
+def _truncate_to_budget(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    # 앞에서부터 예산만큼 (글자당 토큰 수가 달라 한 번에 계산하지 않고 이분 탐색)
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def window_text_for_llm(full_text: str, budget: int = None) -> str:
+    """
+    LLM 프롬프트에 넣을 OCR 텍스트.
+    - 키워드 주변 창들만 원문 그대로 잘라 이어 붙입니다. (원재료 창 우선, 예산을 넘으면 뒤 창은 자르거나 뺌)
+    - 창을 하나도 찾지 못했을 때만 전체 텍스트를 보냅니다. (이 경우에도 예산까지만)
+    """
+    budget = LLM_TOKEN_BUDGET if budget is None else budget
+    full_tokens = estimate_tokens(full_text)
+    windows = find_windows(full_text)
+
+    if not windows:
+        prompt_text = _truncate_to_budget(full_text, budget) if budget > 0 else full_text
+    else:
+        # 원재료 창 -> 주의 문구 창 순서로 예산 안에서 채우고, 다시 원문 순서로 정렬
+        chosen, used = [], 0
+        for start, end, priority in sorted(windows, key=lambda w: (w[2], w[0])):
+            piece = full_text[start:end]
+            if budget > 0:
+                remaining = budget - used
+                if remaining <= 0:
+                    break
+                piece = _truncate_to_budget(piece, remaining)
+                if not piece:
+                    break
+            chosen.append((start, piece))
+            used += estimate_tokens(piece)
+        prompt_text = WINDOW_SEPARATOR.join(piece for _, piece in sorted(chosen))
+
+    sent_tokens = estimate_tokens(prompt_text)
+    with _stats_lock:
+        _prompt_stats["requests"] += 1
+        _prompt_stats["windowed" if windows else "full_text"] += 1
+        _prompt_stats["tokens_full"] += full_tokens
+        _prompt_stats["tokens_sent"] += sent_tokens
+    logger.info(f"LLM 프롬프트 텍스트: ~{sent_tokens}/{full_tokens} 토큰 "
+                f"(windowed={bool(windows)}, 창 {len(windows)}개, 예산 {budget})")
+    return prompt_text
+
+
+def prompt_stats() -> dict:
+    """LLM 에 보낸 OCR 텍스트 토큰 수 집계 (전체 대비 절감률 포함)"""
+    with _stats_lock:
+        stats = dict(_prompt_stats)
+    stats["saved_rate"] = (round(1 - stats["tokens_sent"] / stats["tokens_full"], 3)
+                           if stats["tokens_full"] else 0.0)
+    return stats
@@ -0,0 +1,129 @@
+# app/ocr_Batcher.py
+import os
+import asyncio
+
+
+# 묶음 설정 (환경변수로 조정)
+# - OCR_BATCH_WINDOW_MS: 첫 요청 이후 같은 묶음으로 모을 시간 (0이면 묶지 않음)
+# - OCR_BATCH_MAX: 한 번에 보낼 최대 이미지 수 (Vision batch 요청 상한 16)
+# - OCR_BATCH_MAX_BYTES: 한 묶음의 이미지 바이트 합 상한 (요청 크기 제한 대비)
+# - OCR_BATCH_TIMEOUT_S: 제한 시간이 없는 요청이 섞인 묶음 RPC 의 제한 시간 (초)
+OCR_BATCH_WINDOW_MS = float(os.getenv("OCR_BATCH_WINDOW_MS", "20"))
+OCR_BATCH_MAX = min(int(os.getenv("OCR_BATCH_MAX", "16")), 16)
+OCR_BATCH_MAX_BYTES = int(os.getenv("OCR_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+OCR_BATCH_TIMEOUT_S = float(os.getenv("OCR_BATCH_TIMEOUT_S", "30"))
+
+
+def document_text_request(content: bytes):
+    """DOCUMENT_TEXT_DETECTION 요청 1건"""
+    from google.cloud import vision     # 무거운 모듈이라 실제로 요청을 만들 때 import
+    return vision.AnnotateImageRequest(
+        image=vision.Image(content=content),
+        features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+    )
+
+
+# ----------------------------
+# 동시에 들어온 OCR 요청을 batch_annotate_images 한 번으로 묶기
+# ----------------------------
+class OcrBatcher:
+    """
+    짧은 시간(window_ms) 안에 들어온 이미지들을 모아 batch_annotate_images 한 번으로 보내고,
+    응답을 이미지별로 나눠 기다리던 요청들에게 돌려줍니다.
+    - max_batch 장 또는 max_bytes 가 차면 시간을 기다리지 않고 바로 보냅니다.
+    - semaphore 를 주면 동시에 진행 중인 batch RPC 수를 제한합니다.
+    - RPC 제한 시간은 묶음에서 가장 늦게 끝나는 요청의 남은 시간입니다. (제한 없는 요청이 있으면 timeout)
+    - 이벤트 루프 하나에서만 사용해야 합니다.
+    """
+
+    def __init__(self, client, window_ms: float = OCR_BATCH_WINDOW_MS, max_batch: int = OCR_BATCH_MAX,
+                max_bytes: int = OCR_BATCH_MAX_BYTES, semaphore: asyncio.Semaphore = None,
+                timeout: float = OCR_BATCH_TIMEOUT_S):
+        self.client = client
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.max_bytes = max_bytes
+        self.semaphore = semaphore
+        self.timeout = timeout
+        self.batches_sent = 0
+        self.images_sent = 0
+        self._pending = []          # [(content, future, expires_at)]
+        self._pending_bytes = 0
+        self._timer = None
+        self._tasks = set()         # 진행 중인 전송 작업 (GC 방지)
+
+    async def submit(self, content: bytes, timeout: float = None):
+        """
+        이미지 1장을 묶음에 넣고, 해당 이미지의 AnnotateImageResponse 를 기다립니다.
+        timeout: 이 요청이 응답을 기다릴 수 있는 남은 시간 (초, None 이면 제한 없음)
+        """
+        loop = asyncio.get_running_loop()
+        if self._pending and self._pending_bytes + len(content) > self.max_bytes:
+            self._flush()
+
+        future = loop.create_future()
+        expires_at = loop.time() + timeout if timeout is not None else None
+        self._pending.append((content, future, expires_at))
+        self._pending_bytes += len(content)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list) -> None:
+        # 기다리던 쪽이 이미 취소한 요청은 빼고 보냄
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        requests = [document_text_request(content) for content, _, _ in batch]
+        try:
+            if self.semaphore is not None:
+                async with self.semaphore:
+                    result = await self.client.batch_annotate_images(requests=requests, timeout=self._rpc_timeout(batch))
+            else:
+                result = await self.client.batch_annotate_images(requests=requests, timeout=self._rpc_timeout(batch))
+            self.batches_sent += 1
+            self.images_sent += len(batch)
+
+            responses = list(result.responses)
+            for idx, (_, future, _) in enumerate(batch):
+                if future.done():
+                    continue
+                if idx < len(responses):
+                    future.set_result(responses[idx])
+                else:
+                    future.set_exception(RuntimeError("Vision batch response is missing an image result"))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _rpc_timeout(self, batch: list) -> float:
+        # 세마포어를 기다린 뒤에 계산 (기다린 시간만큼 남은 시간이 줄어듦)
+        expiries = [expires_at for _, _, expires_at in batch]
+        if any(expires_at is None for expires_at in expiries):
+            return self.timeout
+        remaining = max(expiries) - asyncio.get_running_loop().time()
+        return max(remaining, 0.001)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches_sent": self.batches_sent,
+            "images_sent": self.images_sent,
+            "avg_batch": round(self.images_sent / self.batches_sent, 2) if self.batches_sent else 0.0,
+        }
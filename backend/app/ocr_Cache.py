@@ -0,0 +1,179 @@
+# app/ocr_Cache.py
+import os
+import sys
+import hashlib
+import threading
+from .disk_Cache import DiskCache
+from .logger import get_logger
+
+
+# exe 여부에 따라 base_dir 결정
+if getattr(sys, 'frozen', False):
+    # exe 실행 시: exe가 있는 폴더 기준
+    base_dir = os.path.dirname(sys.executable)
+else:
+    # 개발 환경: 이 파일이 있는 폴더 기준
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+# data 폴더 경로
+data_dir = os.path.join(base_dir, "data")
+
+# 캐시 설정 (환경변수로 조정)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") == "1"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(data_dir, "cache", "ocr_cache.sqlite"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+# perceptual hash 해밍 거리 허용치 (0~3, 음수면 유사 이미지 검색 안 함)
+# 기본은 끔: 같은 틀의 포장지(같은 브랜드의 다른 맛 등)는 phash 가 거의 같아도 성분표 글자가 다름
+OCR_PHASH_DISTANCE = min(int(os.getenv("OCR_PHASH_DISTANCE", "-1")), 3)
+
+logger = get_logger("google")
+
+
+# ----------------------------
+# 이미지 내용 기반 OCR 결과 캐시
+# ----------------------------
+class OcrCache:
+    """
+    Vision 응답(직렬화된 protobuf)을 이미지 내용 해시로 저장하는 캐시.
+    - 1차: 정규화된 업로드 바이트의 sha256 이 같으면 적중
+    - 2차: 64비트 perceptual hash 의 해밍 거리가 distance 이하인 이미지가 있으면 적중 (거의 같은 사진)
+      phash 를 16비트씩 4조각으로 나눠 인덱스에 넣으므로, 거리 3 이하의 후보는 항상 한 조각 이상 같습니다.
+      distance 가 음수면 2차 검색을 하지 않습니다 (다른 제품의 OCR 텍스트를 돌려줄 수 있으므로 기본값)
+    phash 행은 응답 본문과 같은 트랜잭션에서 쓰고, 본문이 LRU 로 지워질 때 함께 지워집니다.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS ocr_phash ("
+        "key TEXT PRIMARY KEY, hash INTEGER NOT NULL, "
+        "b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER)",
+        *(f"CREATE INDEX IF NOT EXISTS ocr_phash_b{band} ON ocr_phash(b{band})" for band in range(4)),
+    )
+
+    def __init__(self, path: str, max_bytes: int, distance: int = -1):
+        self.store = DiskCache(path, table="ocr_response", max_bytes=max_bytes,
+                               schema=self.SCHEMA, index_tables=("ocr_phash",))
+        self.distance = distance
+        self.near_hits = 0
+
+    @staticmethod
+    def image_key(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def _bands(phash: int) -> tuple:
+        return tuple((phash >> (16 * band)) & 0xFFFF for band in range(4))
+
+    @staticmethod
+    def _signed(value: int) -> int:
+        # SQLite INTEGER 는 부호 있는 64비트
+        return value - (1 << 64) if value >= (1 << 63) else value
+
+    def _near_key(self, phash: int):
+        bands = self._bands(phash)
+        rows = self.store.query("SELECT key, hash FROM ocr_phash WHERE b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?", bands)
+        best_key, best_dist = None, self.distance + 1
+        for key, stored in rows:
+            dist = bin((stored & 0xFFFFFFFFFFFFFFFF) ^ phash).count("1")
+            if dist < best_dist:
+                best_key, best_dist = key, dist
+        return best_key
+
+    def lookup(self, content: bytes, phash: int = None):
+        """캐시된 응답 바이트를 반환 (없으면 None)"""
+        blob = self.store.get(self.image_key(content))
+        if blob is not None or phash is None or self.distance < 0:
+            return blob
+
+        key = self._near_key(phash)
+        if key is None:
+            return None
+        blob = self.store.get(key)
+        if blob is None:
+            # TTL 이 지났거나 다른 워커가 방금 지운 경우
+            return None
+        # 유사 이미지 적중은 앞선 정확 조회 miss 를 되돌려 hit 로 집계
+        self.store.misses -= 1
+        self.near_hits += 1
+        return blob
+
+    def store_response(self, content: bytes, phash: int, blob: bytes) -> None:
+        key = self.image_key(content)
+        related = ()
+        if phash is not None:
+            related = ((
+                "INSERT OR REPLACE INTO ocr_phash (key, hash, b0, b1, b2, b3) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self._signed(phash), *self._bands(phash)),
+            ),)
+        self.store.set(key, blob, related)
+
+    def stats(self) -> dict:
+        stats = self.store.stats()
+        stats["near_hits"] = self.near_hits
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """OCR 캐시 (OCR_CACHE_ENABLED=0 이면 None)"""
+    global _cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OcrCache(OCR_CACHE_PATH, OCR_CACHE_MAX_MB * 1024 * 1024, OCR_PHASH_DISTANCE)
+    return _cache
+
+
+def lookup_cached(content: bytes, phash: int, deserialize, base_filename: str = None):
+    """캐시된 응답을 deserialize 해서 반환 (없거나 캐시가 꺼져 있으면 None)"""
+    cache = get_ocr_cache()
+    if cache is None:
+        return None
+    try:
+        blob = cache.lookup(content, phash)
+        if blob is not None:
+            logger.info(f"OCR cache hit [{base_filename}]")
+            return deserialize(blob)
+    except Exception as e:
+        # 캐시 자체가 실패해도 OCR 은 그대로 진행
+        logger.warning(f"OCR cache lookup failed [{base_filename}]: {e}")
+    return None
+
+
+def store_cached(content: bytes, phash: int, response, serialize, base_filename: str = None) -> None:
+    """정상 응답만 저장 (오류가 담긴 응답은 저장하지 않음)"""
+    cache = get_ocr_cache()
+    if cache is None or not response or getattr(getattr(response, "error", None), "message", ""):
+        return
+    try:
+        cache.store_response(content, phash, serialize(response))
+    except Exception as e:
+        logger.warning(f"OCR cache store failed [{base_filename}]: {e}")
+
+
+def cached_ocr(content: bytes, phash: int, call, serialize, deserialize, base_filename: str = None):
+    """
+    캐시를 먼저 확인하고, 없을 때만 call() 로 Vision 을 호출해 결과를 저장합니다.
+    - serialize(response) -> bytes, deserialize(bytes) -> response
+    """
+    response = lookup_cached(content, phash, deserialize, base_filename)
+    if response is not None:
+        return response
+
+    response = call()
+    store_cached(content, phash, response, serialize, base_filename)
+    return response
+
+
+def ocr_cache_stats() -> dict:
+    cache = get_ocr_cache()
+    if cache is None:
+        return {"enabled": False}
+    stats = cache.stats()
+    stats["enabled"] = True
+    return stats
@@ -0,0 +1,229 @@
+# app/ocr_Layout.py
+import json
+from array import array
+
+
+# ----------------------------
+# Google Vision 응답 -> 가벼운 레이아웃 모델
+# ----------------------------
+class OcrLayout:
+    """
+    Vision 응답(protobuf)을 한 번만 훑어서 만든 압축 레이아웃.
+    - full_text : full_text_annotation.text (LLM / 주의 문구 검사용)
+    - buffer    : 모든 블록 텍스트를 '\\n'으로 이어 붙인 하나의 문자열
+    - 블록/문단 위치, 페이지 번호, 바운딩 박스, 신뢰도는 모두 array 에 담아 buffer 를 가리킵니다.
+    이후 단계는 protobuf 대신 이 객체만 사용하므로, 요청 내내 protobuf를 붙잡고 있을 필요가 없습니다.
+
+    블록 텍스트 규칙은 기존 section_text 와 같습니다.
+    - 단어는 글자(symbol)를 그대로 이어 붙이고, 문단 안의 단어도 공백 없이 이어 붙임
+    - 비어 있지 않은 문단 사이에는 공백 한 칸, 마지막에 strip()
+    """
+    __slots__ = (
+        "full_text", "buffer", "page_count",
+        "block_pages", "block_starts", "block_ends",
+        "block_boxes", "block_confidences",
+        "block_para_index", "para_starts", "para_ends",
+    )
+
+    def __init__(self, full_text: str = "", buffer: str = "", page_count: int = 0,
+                block_pages=None, block_starts=None, block_ends=None,
+                block_boxes=None, block_confidences=None,
+                block_para_index=None, para_starts=None, para_ends=None):
+        self.full_text = full_text
+        self.buffer = buffer
+        self.page_count = page_count
+        self.block_pages = block_pages if block_pages is not None else array("I")
+        self.block_starts = block_starts if block_starts is not None else array("I")
+        self.block_ends = block_ends if block_ends is not None else array("I")
+        # 블록마다 (min_x, min_y, max_x, max_y) 4칸씩
+        self.block_boxes = block_boxes if block_boxes is not None else array("i")
+        self.block_confidences = block_confidences if block_confidences is not None else array("f")
+        # 블록 i의 문단 = para_starts[block_para_index[i]:block_para_index[i + 1]]
+        self.block_para_index = block_para_index if block_para_index is not None else array("I", [0])
+        self.para_starts = para_starts if para_starts is not None else array("I")
+        self.para_ends = para_ends if para_ends is not None else array("I")
+
+    # ----------------------------
+    # 조회
+    # ----------------------------
+    @property
+    def block_count(self) -> int:
+        return len(self.block_starts)
+
+    def block_text(self, idx: int) -> str:
+        return self.buffer[self.block_starts[idx]:self.block_ends[idx]]
+
+    def block_box(self, idx: int) -> tuple:
+        return tuple(self.block_boxes[idx * 4:idx * 4 + 4])
+
+    def paragraph_texts(self, idx: int) -> list[str]:
+        lo, hi = self.block_para_index[idx], self.block_para_index[idx + 1]
+        return [self.buffer[self.para_starts[i]:self.para_ends[i]] for i in range(lo, hi)]
+
+    def iter_pages(self):
+        """페이지 순서대로 해당 페이지의 블록 텍스트 리스트를 돌려줍니다."""
+        pages = [[] for _ in range(self.page_count)]
+        for idx in range(self.block_count):
+            pages[self.block_pages[idx]].append(self.block_text(idx))
+        return iter(pages)
+
+    def __bool__(self):
+        return bool(self.full_text) or self.page_count > 0
+
+    # ----------------------------
+    # 직렬화 (캐시 저장용)
+    # ----------------------------
+    def to_dict(self) -> dict:
+        return {
+            "full_text": self.full_text,
+            "buffer": self.buffer,
+            "page_count": self.page_count,
+            "block_pages": self.block_pages.tolist(),
+            "block_starts": self.block_starts.tolist(),
+            "block_ends": self.block_ends.tolist(),
+            "block_boxes": self.block_boxes.tolist(),
+            "block_confidences": self.block_confidences.tolist(),
+            "block_para_index": self.block_para_index.tolist(),
+            "para_starts": self.para_starts.tolist(),
+            "para_ends": self.para_ends.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OcrLayout":
+        return cls(
+            full_text=data.get("full_text", ""),
+            buffer=data.get("buffer", ""),
+            page_count=data.get("page_count", 0),
+            block_pages=array("I", data.get("block_pages", [])),
+            block_starts=array("I", data.get("block_starts", [])),
+            block_ends=array("I", data.get("block_ends", [])),
+            block_boxes=array("i", data.get("block_boxes", [])),
+            block_confidences=array("f", data.get("block_confidences", [])),
+            block_para_index=array("I", data.get("block_para_index", [0])),
+            para_starts=array("I", data.get("para_starts", [])),
+            para_ends=array("I", data.get("para_ends", [])),
+        )
+
+    def dumps(self) -> bytes:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data: bytes) -> "OcrLayout":
+        return cls.from_dict(json.loads(data.decode("utf-8")))
+
+    # ----------------------------
+    # 여러 장 합치기
+    # ----------------------------
+    @classmethod
+    def concat(cls, layouts) -> "OcrLayout":
+        """
+        한 제품을 여러 장으로 나눠 찍은 경우: 레이아웃들을 순서대로 이어 붙입니다.
+        뒤 사진의 페이지는 앞 사진 페이지 뒤로 이어지므로, 사진 경계에서 끊긴 원재료 목록도 section_text 가 이어서 읽습니다.
+        """
+        merged = cls()
+        texts, parts = [], []
+        offset = 0          # 현재 buffer 길이
+        page_offset = 0
+        for layout in layouts:
+            if layout.full_text:
+                texts.append(layout.full_text)
+            if merged.block_count and layout.block_count:
+                parts.append("\n")
+                offset += 1
+            parts.append(layout.buffer)
+
+            para_base = len(merged.para_starts)
+            merged.block_pages.extend(page + page_offset for page in layout.block_pages)
+            merged.block_starts.extend(pos + offset for pos in layout.block_starts)
+            merged.block_ends.extend(pos + offset for pos in layout.block_ends)
+            merged.block_boxes.extend(layout.block_boxes)
+            merged.block_confidences.extend(layout.block_confidences)
+            merged.block_para_index.extend(idx + para_base for idx in layout.block_para_index[1:])
+            merged.para_starts.extend(pos + offset for pos in layout.para_starts)
+            merged.para_ends.extend(pos + offset for pos in layout.para_ends)
+
+            offset += len(layout.buffer)
+            page_offset += layout.page_count
+
+        merged.full_text = "\n".join(texts)
+        merged.buffer = "".join(parts)
+        merged.page_count = page_offset
+        return merged
+
+    # ----------------------------
+    # Vision 응답 변환
+    # ----------------------------
+    @classmethod
+    def from_vision_response(cls, response) -> "OcrLayout":
+        """
+        Vision 응답을 레이아웃으로 변환합니다.
+        OCR 실패로 응답 대신 문자열("" 등)이 오거나 full_text_annotation 이 없으면 빈 레이아웃을 반환합니다.
+        """
+        layout = cls()
+        full = getattr(response, "full_text_annotation", None)
+        if not full:
+            return layout
+
+        layout.full_text = full.text or ""
+        pages = getattr(full, "pages", None) or []
+        layout.page_count = len(pages)
+
+        parts = []      # buffer 조각
+        offset = 0      # 현재 buffer 길이
+        for page_idx, page in enumerate(pages):
+            for block in page.blocks:
+                # 문단 텍스트 (단어는 공백 없이 이어 붙임)
+                para_texts = []
+                for paragraph in block.paragraphs:
+                    para_text = "".join(
+                        symbol.text for word in paragraph.words for symbol in word.symbols
+                    )
+                    if para_text:
+                        para_texts.append(para_text)
+
+                joined = " ".join(para_texts)
+                block_text = joined.strip()
+                lead = len(joined) - len(joined.lstrip())
+
+                if parts:
+                    parts.append("\n")
+                    offset += 1
+                start = offset
+
+                # 문단 위치 (strip 으로 잘린 앞부분만큼 보정)
+                pos = -lead
+                for para_text in para_texts:
+                    p_start = min(max(pos, 0), len(block_text))
+                    p_end = min(max(pos + len(para_text), 0), len(block_text))
+                    layout.para_starts.append(start + p_start)
+                    layout.para_ends.append(start + p_end)
+                    pos += len(para_text) + 1
+                layout.block_para_index.append(len(layout.para_starts))
+
+                parts.append(block_text)
+                offset += len(block_text)
+
+                layout.block_pages.append(page_idx)
+                layout.block_starts.append(start)
+                layout.block_ends.append(offset)
+                layout.block_boxes.extend(_box(getattr(block, "bounding_box", None)))
+                layout.block_confidences.append(float(getattr(block, "confidence", 0.0) or 0.0))
+
+        layout.buffer = "".join(parts)
+        return layout
+
+
+def _box(bounding_box) -> tuple:
+    vertices = list(getattr(bounding_box, "vertices", None) or [])
+    if not vertices:
+        return (0, 0, 0, 0)
+    xs = [int(v.x) for v in vertices]
+    ys = [int(v.y) for v in vertices]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def to_layout(response) -> OcrLayout:
+    """이미 OcrLayout 이면 그대로, 아니면 Vision 응답을 변환해서 반환합니다."""
+    if isinstance(response, OcrLayout):
+        return response
+    return OcrLayout.from_vision_response(response)
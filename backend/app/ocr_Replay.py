@@ -0,0 +1,96 @@
+# app/ocr_Replay.py
+import os
+import sys
+import asyncio
+import hashlib
+from .logger import get_logger
+from .image_Preprocess import ensure_prepared
+
+
+# exe 여부에 따라 base_dir 결정
+if getattr(sys, 'frozen', False):
+    # exe 실행 시: exe가 있는 폴더 기준
+    base_dir = os.path.dirname(sys.executable)
+else:
+    # 개발 환경: 이 파일이 있는 폴더 기준
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+# data 폴더 경로
+data_dir = os.path.join(base_dir, "data")
+
+# 녹화된 Vision 응답을 읽어 올 폴더
+OCR_REPLAY_DIR = os.getenv("OCR_REPLAY_DIR", os.path.join(data_dir, "ocr_replay"))
+# 설정하면 실제 Vision 응답을 이 폴더에 녹화 (replay 백엔드용 자료 수집)
+OCR_RECORD_DIR = os.getenv("OCR_RECORD_DIR", "")
+
+logger = get_logger("google")
+
+# 읽어 둔 녹화 (key -> 바이트). 찾은 것만 담아 두므로 녹화를 나중에 추가해도 바로 보입니다.
+_RECORDING_CACHE_SIZE = 256
+_recordings = {}
+
+
+# ----------------------------
+# 녹화된 Vision 응답 재생 (오프라인 부하/성능 회귀 테스트용)
+# ----------------------------
+def replay_key(content: bytes) -> str:
+    """전처리된 업로드 바이트의 sha256 (OCR 캐시 키와 같은 기준)"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def record_response(content: bytes, response) -> None:
+    """OCR_RECORD_DIR 이 설정되어 있으면 응답을 <sha256>.pb 로 저장합니다."""
+    if not OCR_RECORD_DIR or not response or isinstance(response, str):
+        return
+    try:
+        from google.cloud import vision
+        os.makedirs(OCR_RECORD_DIR, exist_ok=True)
+        path = os.path.join(OCR_RECORD_DIR, f"{replay_key(content)}.pb")
+        with open(path, "wb") as f:
+            f.write(vision.AnnotateImageResponse.serialize(response))
+    except Exception as e:
+        logger.warning(f"OCR record failed: {e}")
+
+
+def _load_recording(key: str):
+    blob = _recordings.get(key)
+    if blob is not None:
+        return blob
+    path = os.path.join(OCR_REPLAY_DIR, f"{key}.pb")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        blob = f.read()
+    if len(_recordings) >= _RECORDING_CACHE_SIZE:
+        # 가장 먼저 읽은 녹화부터 비움
+        _recordings.pop(next(iter(_recordings)), None)
+    _recordings[key] = blob
+    return blob
+
+
+def replay_ocr(image, debug=True, base_filename=None, version=1, source_size=None, deadline=None):
+    """
+    google_ocr 와 같은 전처리를 거친 이미지 해시로 녹화된 응답을 찾아 돌려줍니다. (네트워크 호출 없음)
+    녹화가 없으면 OCR 실패와 똑같이 "" 를 반환합니다.
+    (디스크에서 읽기만 하므로 deadline 은 받기만 하고 쓰지 않습니다.)
+    """
+    try:
+        content, _stats = ensure_prepared(image, source_size=source_size)
+        key = replay_key(content)
+        blob = _load_recording(key)
+        if blob is None:
+            logger.warning(f"OCR replay miss [{base_filename}]: {key}")
+            return ""
+
+        from google.cloud import vision
+        if debug:
+            logger.info(f"OCR replay hit [{base_filename}]: {key}")
+        return vision.AnnotateImageResponse.deserialize(blob)
+    except Exception as e:
+        logger.error(f"OCR replay failed {base_filename} : {str(e)}")
+        return ""
+
+
+async def replay_ocr_async(image, debug=True, base_filename=None, version=1, source_size=None, deadline=None):
+    return await asyncio.to_thread(replay_ocr, image, debug, base_filename, version, source_size, deadline)
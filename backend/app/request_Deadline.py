@@ -0,0 +1,72 @@
+# app/request_Deadline.py
+import os
+import time
+
+
+# 요청 1건 전체 처리 시간 상한 (초). 프론트엔드(script.js)는 30초에 요청을 포기하므로 그보다 짧게.
+REQUEST_BUDGET_S = float(os.getenv("REQUEST_BUDGET_S", "25"))
+# 클라이언트가 남은 시간을 알려 줄 때 쓰는 헤더 (밀리초). REQUEST_BUDGET_S 보다 길게는 못 늘림
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+
+class DeadlineExceeded(TimeoutError):
+    """요청 시간 예산을 다 써서 다음 단계를 시작하지 않을 때 발생"""
+
+
+# ----------------------------
+# 요청 단위 시간 예산 (OCR -> LLM -> 매칭 각 단계가 남은 시간만 사용)
+# ----------------------------
+class Deadline:
+    """
+    요청이 시작된 시점부터의 시간 예산.
+    - remaining(): 남은 시간 (초, 0 이상)
+    - timeout(cap): 다음 단계에 줄 제한 시간 = min(남은 시간, cap)
+    - check(stage): 이미 시간이 지났으면 DeadlineExceeded
+    - degrade(reason): 시간 부족으로 건너뛰거나 줄인 단계를 기록 (응답의 degraded_reason)
+    """
+
+    __slots__ = ("budget", "started", "expires_at", "reasons")
+
+    def __init__(self, budget_s: float = REQUEST_BUDGET_S):
+        self.budget = max(0.0, budget_s)
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.budget
+        self.reasons = []
+
+    @classmethod
+    def from_header(cls, value, max_budget_s: float = REQUEST_BUDGET_S) -> "Deadline":
+        """헤더 값(밀리초)이 있으면 그 시간과 max_budget_s 중 짧은 쪽을 예산으로 사용"""
+        budget = max_budget_s
+        if value:
+            try:
+                budget = min(budget, float(value) / 1000)
+            except ValueError:
+                pass
+        return cls(budget)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: float = None) -> float:
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            self.degrade(f"{stage}_deadline")
+            raise DeadlineExceeded(f"request deadline exceeded before {stage} "
+                                   f"({self.elapsed():.2f}s of {self.budget:.2f}s)")
+
+    def degrade(self, reason: str) -> None:
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.reasons)
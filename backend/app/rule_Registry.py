@@ -0,0 +1,172 @@
+# app/rule_Registry.py
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from .keyword_Matcher import ForbiddenMatcher
+
+
+# exe 여부에 따라 base_dir 결정
+if getattr(sys, 'frozen', False):
+    # exe 실행 시: exe가 있는 폴더 기준
+    base_dir = os.path.dirname(sys.executable)
+else:
+    # 개발 환경: 이 파일이 있는 폴더 기준
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+# data 폴더 경로
+data_dir = os.path.join(base_dir, "data")
+
+# 사용자 유형 -> 규칙 파일 (없는 유형은 빈 규칙)
+RULE_FILES = {
+    "Vegan": "strict_vegan_forbidden.json",             # Strict Vegan
+    "Pesco-vegetarian": "pesco_forbidden.json",         # Pesco
+}
+
+# --- '식물성 유지'처럼 앞에 붙으면 금지 성분으로 보지 않는 예외 키워드 ---
+# 규칙 파일의 "exception_prefixes"가 우선이며,
+# 이 값은 예전 형식(최상위 리스트) 파일이나 규칙 파일이 없는 유형에만 쓰입니다.
+EXCEPTION_KEYWORDS = ['식물성', '야채', '채소', '콩']
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    user_type 하나에 대한 불변 규칙 세트.
+    - entries: 검증된 원본 항목 (읽기 전용)
+    - exception_prefixes: 앞에 붙으면 금지 성분으로 보지 않는 접두어 (규칙 파일에서 읽음)
+    - matcher: 미리 컴파일된 금지 성분 오토마톤
+    - 리스트처럼 순회/len()/인덱싱이 가능해서 기존 ban_List 결과 자리에 그대로 쓸 수 있습니다.
+    """
+    user_type: str
+    path: str
+    entries: tuple
+    exception_prefixes: tuple
+    matcher: ForbiddenMatcher
+    version: str
+    loaded_at: float
+    load_ms: float
+
+    def find(self, text: str) -> list[str]:
+        return self.matcher.find(text)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, idx):
+        return self.entries[idx]
+
+
+_rule_sets = {}
+_lock = threading.Lock()
+
+
+def _split_rule_file(raw, path: str):
+    """
+    규칙 파일 -> (항목 리스트, 예외 접두어 튜플)
+    - 새 형식: {"exception_prefixes": [...], "entries": [...]}
+    - 예전 형식: [...] (예외 접두어는 EXCEPTION_KEYWORDS 사용)
+    """
+    if isinstance(raw, list):
+        return raw, tuple(EXCEPTION_KEYWORDS)
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: 규칙 파일은 객체 또는 리스트여야 합니다.")
+
+    prefixes = raw.get("exception_prefixes", [])
+    if not isinstance(prefixes, list) or not all(isinstance(p, str) and p.strip() for p in prefixes):
+        raise ValueError(f"{path}: exception_prefixes는 비어 있지 않은 문자열 리스트여야 합니다.")
+    return raw.get("entries"), tuple(p.strip() for p in prefixes)
+
+
+def _validate_entries(raw, path: str) -> tuple:
+    if not isinstance(raw, list):
+        raise ValueError(f"{path}: entries는 리스트여야 합니다.")
+
+    entries = []
+    for i, entry in enumerate(raw):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path}: {i}번째 항목이 객체가 아닙니다.")
+        keyword = entry.get("keyword")
+        if not isinstance(keyword, str) or not keyword.strip():
+            raise ValueError(f"{path}: {i}번째 항목의 keyword가 비어 있습니다.")
+        clean = dict(entry)
+        for field in ("korean", "e_code"):
+            values = entry.get(field, [])
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{path}: {i}번째 항목({keyword})의 {field}는 문자열 리스트여야 합니다.")
+            clean[field] = tuple(values)
+        entries.append(MappingProxyType(clean))
+    return tuple(entries)
+
+
+def _load_rule_set(user_type: str) -> RuleSet:
+    started = time.perf_counter()
+    file_name = RULE_FILES.get(user_type)
+
+    if file_name is None:
+        # 규칙 파일이 없는 유형(Lacto, Ovo 등)은 빈 규칙
+        path, data, entries = "", b"", ()
+        exception_prefixes = tuple(EXCEPTION_KEYWORDS)
+    else:
+        path = os.path.abspath(os.path.join(data_dir, file_name))
+        with open(path, "rb") as f:
+            data = f.read()
+        raw_entries, exception_prefixes = _split_rule_file(json.loads(data.decode("utf-8")), path)
+        entries = _validate_entries(raw_entries, path)
+
+    matcher = ForbiddenMatcher(entries, exception_prefixes)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    return RuleSet(
+        user_type=user_type,
+        path=path,
+        entries=entries,
+        exception_prefixes=exception_prefixes,
+        matcher=matcher,
+        version=hashlib.sha256(data).hexdigest()[:16],
+        loaded_at=time.time(),
+        load_ms=load_ms,
+    )
+
+
+def get_rule_set(user_type: str = "Vegan") -> RuleSet:
+    """
+    user_type 에 맞는 규칙 세트를 돌려줍니다.
+    - 프로세스(워커)마다 파일당 한 번만 읽고 검증/컴파일하며, 이후에는 같은 객체를 재사용합니다.
+    """
+    if user_type not in RULE_FILES:
+        user_type = ""  # 규칙 파일이 없는 유형은 하나의 빈 규칙 세트를 공유
+
+    rule_set = _rule_sets.get(user_type)
+    if rule_set is not None:
+        return rule_set
+
+    with _lock:
+        rule_set = _rule_sets.get(user_type)
+        if rule_set is None:
+            rule_set = _load_rule_set(user_type)
+            _rule_sets[user_type] = rule_set
+    return rule_set
+
+
+def registry_stats() -> dict:
+    """로드된 규칙 세트별 항목 수 / 로드 시간 / 버전 정보"""
+    return {
+        user_type: {
+            "path": rs.path,
+            "entries": len(rs.entries),
+            "exception_prefixes": list(rs.exception_prefixes),
+            "version": rs.version,
+            "load_ms": round(rs.load_ms, 2),
+            "loaded_at": rs.loaded_at,
+        }
+        for user_type, rs in list(_rule_sets.items())
+    }
@@ -0,0 +1,54 @@
+# app/startup_Report.py
+import os
+import sys
+import time
+
+try:
+    import resource     # Windows(exe 배포)에는 없음 -> 메모리 보고 생략
+except ImportError:
+    resource = None
+
+
+# 워커 기동 시 import 에 쓸 수 있는 시간 (ms). 넘으면 보고서에 over_budget 으로 표시
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "500"))
+
+# 요청을 처리하기 전에는 로드되지 않아야 하는 무거운 모듈들 (OCR/LLM 클라이언트는 처음 사용할 때 로드)
+HEAVY_MODULES = ("google.cloud.vision", "grpc", "openai")
+
+_timings = {}
+
+
+def record_import(name: str, started: float) -> None:
+    """started(time.perf_counter 값)부터 지금까지를 name 의 import 시간으로 기록"""
+    _timings[name] = (time.perf_counter() - started) * 1000
+
+
+def import_report(budget_ms: float = IMPORT_BUDGET_MS) -> dict:
+    """
+    import 시간 보고서.
+    - timings_ms: 기록된 구간별 import 시간
+    - heavy_modules_loaded: 이미 로드된 무거운 모듈 (기동 직후라면 비어 있어야 정상)
+    """
+    # 구간이 중첩되어 있으므로(main 안에 app) 가장 긴 구간을 전체 시간으로 봅니다.
+    total = max(_timings.values(), default=0.0)
+    return {
+        "pid": os.getpid(),
+        "timings_ms": {name: round(ms, 1) for name, ms in _timings.items()},
+        "total_ms": round(total, 1),
+        "budget_ms": budget_ms,
+        "over_budget": total > budget_ms,
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def peak_rss_mb():
+    """
+    이 프로세스의 최대 메모리 사용량(peak RSS, MB). 지원하지 않는 OS 에서는 None.
+    프로세스 전체의 최고치이므로, 요청 전후 값의 차이 = 그 요청이 최고치를 얼마나 끌어올렸는지.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KB, macOS 는 바이트 단위
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
@@ -0,0 +1,95 @@
+# app/upload_Limit.py
+import os
+import json
+
+
+# 업로드 본문 최대 크기 (바이트). 이미지 1장 요청 기준, 경로별로 따로 줄 수 있음
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+
+# ----------------------------
+# 업로드 크기 제한 (본문을 받는 도중에 끊음)
+# ----------------------------
+class UploadLimitMiddleware:
+    """
+    POST 요청 본문 크기를 제한하는 ASGI 미들웨어.
+    - Content-Length 가 한도를 넘으면 본문을 읽기 전에 바로 413
+    - Content-Length 가 없거나 틀려도, 받은 바이트 수를 세다가 한도를 넘는 순간 413
+      (multipart 파싱이 임시 파일/메모리에 끝까지 받아 두기 전에 끊김)
+    두 경우 모두 같은 {"error": ...} 413 응답을 이 미들웨어가 직접 보냅니다.
+    limits: {경로: 최대 바이트} (없는 경로는 default_bytes)
+    """
+
+    def __init__(self, app, default_bytes: int = MAX_UPLOAD_BYTES, limits: dict = None):
+        self.app = app
+        self.default_bytes = default_bytes
+        self.limits = limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limits.get(scope["path"], self.default_bytes)
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await _send_too_large(send, max_bytes)
+            return
+
+        received = 0
+        too_large = False
+        replaced = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    too_large = True
+                    raise _UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal replaced
+            if message["type"] == "http.response.start" and too_large:
+                # 본문 파싱이 끊겨 앱이 만든 오류 응답(FastAPI 는 400) 대신 같은 413 을 보냄
+                replaced = True
+                await _send_too_large(send, max_bytes)
+                return
+            if not replaced:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _UploadTooLarge:
+            # 앱이 예외를 응답으로 바꾸지 않고 그대로 올려 보낸 경우
+            if not replaced:
+                await _send_too_large(send, max_bytes)
+
+
+class _UploadTooLarge(Exception):
+    """본문이 한도를 넘었음 (미들웨어 안에서만 사용)"""
+
+
+def _too_large_message(max_bytes: int) -> str:
+    # 1 MiB 미만 한도를 MB 로 내리면 "max 0 MB" 가 되므로 KB / 바이트 단위로 표시
+    if max_bytes >= 1024 * 1024:
+        size, unit = max_bytes / (1024 * 1024), "MB"
+    elif max_bytes >= 1024:
+        size, unit = max_bytes / 1024, "KB"
+    else:
+        return f"Upload too large (max {max_bytes} bytes)"
+    size_text = f"{size:.1f}".removesuffix(".0")
+    return f"Upload too large (max {size_text} {unit})"
+
+
+async def _send_too_large(send, max_bytes: int) -> None:
+    body = json.dumps({"error": _too_large_message(max_bytes)}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
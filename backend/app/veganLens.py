@@ -1,10 +1,15 @@
-from google.cloud import vision
 from PIL import Image
-from io import BytesIO
 from .logger import get_logger
+from .image_Preprocess import ensure_prepared
+from .ocr_Cache import cached_ocr, lookup_cached, store_cached
+from .ocr_Batcher import OcrBatcher, document_text_request, OCR_BATCH_WINDOW_MS
+from .ocr_Replay import record_response
 import os
 import sys
+import asyncio
+import threading
 # :흰색_확인_표시: IMY 전용 Google Vision 기반 OCR 함수
+# ※ google-cloud-vision / grpc 는 무거워서 import 시점이 아니라 처음 OCR 할 때 불러옵니다.
 
 # exe 여부에 따라 base_dir 결정
 if getattr(sys, 'frozen', False):
@@ -21,28 +26,89 @@ data_dir = os.path.join(base_dir, "data")
 # API Key 경로
 API_PATH = os.path.join(data_dir, "veganlens_API_Key.json")
 
-# JSON 키 경로 등록
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = API_PATH
-
-# Vision 클라이언트 생성
-client = vision.ImageAnnotatorClient()
+# 1이면 실제 Vision 대신 가짜 클라이언트 사용 (테스트/오프라인 부하 측정용)
+OCR_FAKE_VISION = os.getenv("OCR_FAKE_VISION", "0") == "1"
 
 logger = get_logger("google")
 
-def google_ocr(image: Image.Image, debug: bool = True, base_filename: str = None) -> str:
+# 비동기 OCR 동시 요청 상한 (워커당)
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "64"))
+
+# 동기 클라이언트는 프로세스(pid)마다 하나. fork 된 워커는 부모의 gRPC 채널을 절대 재사용하지 않습니다.
+_sync_state = {"pid": None, "client": None}
+_sync_lock = threading.Lock()
+
+# 비동기 클라이언트는 이벤트 루프에 묶이므로 루프별로 하나씩 만듭니다.
+# OCR_BATCH_WINDOW_MS > 0 이면 동시에 들어온 요청을 batch_annotate_images 로 묶어서 보냅니다.
+_async_state = {"loop": None, "client": None, "semaphore": None, "batcher": None}
+
+
+def _vision():
+    """google.cloud.vision 모듈 (처음 호출할 때 import)"""
+    from google.cloud import vision
+    return vision
+
+
+def _reset_clients() -> None:
+    """fork 직후 자식 프로세스에서 부모가 만든 클라이언트를 버립니다."""
+    _sync_state["pid"] = None
+    _sync_state["client"] = None
+    _async_state.update(loop=None, client=None, semaphore=None, batcher=None)
+
+
+if hasattr(os, "register_at_fork"):
+    # Windows 에는 fork 가 없어서 등록하지 않음
+    os.register_at_fork(after_in_child=_reset_clients)
+
+
+def get_vision_client():
+    """
+    현재 프로세스용 동기 Vision 클라이언트 (처음 사용할 때 생성).
+    pid 가 바뀌었으면(fork) 새로 만듭니다.
+    """
+    pid = os.getpid()
+    if _sync_state["pid"] == pid:
+        return _sync_state["client"]
+
+    with _sync_lock:
+        if _sync_state["pid"] != pid:
+            if OCR_FAKE_VISION:
+                from .fake_Vision import FakeVisionClient
+                _sync_state["client"] = FakeVisionClient()
+            else:
+                # JSON 키 경로 등록
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = API_PATH
+                _sync_state["client"] = _vision().ImageAnnotatorClient()
+            _sync_state["pid"] = pid
+    return _sync_state["client"]
+
+def google_ocr(image: Image.Image, debug: bool = True, base_filename: str = None, source_size: int = None,
+               deadline=None) -> str:
+    # deadline: 요청 시간 예산 (request_Deadline.Deadline). 있으면 Vision 호출에 남은 시간만 줍니다.
+    # image: PIL Image 또는 이미 인코딩된 PreparedImage (image_Pool 에서 전처리한 경우 그대로 전송)
     try:
         logger.info(f"OCR started: {base_filename}")  # 1️⃣ OCR 시작 로그
+        if deadline is not None:
+            deadline.check("ocr")
         
-        # ✅ 이미지 바이너리로 변환 (정상 방식)
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG")
-        content = buffer.getvalue()
+        # ✅ 업로드 전 정규화 (EXIF 회전, 모드 변환, 축소, 재인코딩)
+        content, stats = ensure_prepared(image, source_size=source_size)
+        _log_payload(stats, base_filename)
         
         # Google Vision용 이미지 객체 생성
+        vision = _vision()
+        client = get_vision_client()
         image = vision.Image(content=content)
-        # OCR 요청
-        response = client.document_text_detection(image=image)
+        # OCR 요청 (같은/거의 같은 이미지는 디스크 캐시에서 바로 반환, 네트워크 호출 없음)
+        response = cached_ocr(
+            content, stats["phash"],
+            call=lambda: client.document_text_detection(image=image, timeout=_ocr_timeout(deadline)),
+            serialize=vision.AnnotateImageResponse.serialize,
+            deserialize=vision.AnnotateImageResponse.deserialize,
+            base_filename=base_filename,
+        )
         # document_text_detection은 이미지 전체의 텍스트와 그 구조(블록, 문단 등)를 분석하여 반환합니다.
+        record_response(content, response)  # OCR_RECORD_DIR 설정 시 replay 백엔드용으로 녹화
         
         
         # texts = response.full_text_annotation.text.strip()
@@ -56,18 +122,145 @@ def google_ocr(image: Image.Image, debug: bool = True, base_filename: str = None
             logger.warning(f"OCR returned no Response: {base_filename}")  # ✅ 빈 결과 로그
             return "텍스트를 인식할 수 없습니다."
     except Exception as e:
+        _note_ocr_failure(deadline)
         logger.error(f"OCR failed {base_filename} : {str(e)}")
         return ""
 
 
-def extract_section(image, debug=True, base_filename=None, version=1):
+def _ocr_timeout(deadline):
+    """Vision 호출 제한 시간 (예산이 없으면 None = 클라이언트 기본값). 이미 시간이 없으면 DeadlineExceeded"""
+    if deadline is None:
+        return None
+    deadline.check("ocr")
+    return deadline.timeout()
+
+
+def _note_ocr_failure(deadline) -> None:
+    # 예산을 다 써서 실패한 경우 응답에 degraded 로 표시되도록 기록
+    if deadline is not None and deadline.expired():
+        deadline.degrade("ocr_deadline")
+
+
+def _log_payload(stats: dict, base_filename: str) -> None:
+    logger.info(
+        f"OCR payload [{base_filename}]: {stats['bytes_before']} -> {stats['bytes_after']} bytes, "
+        f"{stats['size_before'][0]}x{stats['size_before'][1]} -> "
+        f"{stats['size_after'][0]}x{stats['size_after'][1]} {stats['format']}"
+    )
+
+
+def _get_async_state() -> dict:
+    """현재 이벤트 루프용 비동기 Vision 클라이언트, 동시성 세마포어, 묶음 전송기"""
+    loop = asyncio.get_running_loop()
+    if _async_state["loop"] is not loop:
+        if OCR_FAKE_VISION:
+            from .fake_Vision import FakeVisionAsyncClient
+            async_client = FakeVisionAsyncClient()
+        else:
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = API_PATH
+            async_client = _vision().ImageAnnotatorAsyncClient()
+        semaphore = asyncio.Semaphore(OCR_MAX_CONCURRENCY)
+        _async_state["client"] = async_client
+        _async_state["semaphore"] = semaphore
+        _async_state["batcher"] = (
+            OcrBatcher(async_client, semaphore=semaphore) if OCR_BATCH_WINDOW_MS > 0 else None
+        )
+        _async_state["loop"] = loop
+    return _async_state
+
+
+def ocr_batch_stats() -> dict:
+    batcher = _async_state["batcher"]
+    return batcher.stats() if batcher is not None else {"enabled": False}
+
+
+def _prepare_and_lookup(image, source_size, base_filename):
+    """(스레드에서 실행) 전처리(PreparedImage 면 생략) + 캐시 조회"""
+    content, stats = ensure_prepared(image, source_size=source_size)
+    _log_payload(stats, base_filename)
+    cached = lookup_cached(content, stats["phash"], _vision().AnnotateImageResponse.deserialize, base_filename)
+    return content, stats, cached
+
+
+def _store_and_record(content, phash, response, base_filename):
+    """(스레드에서 실행) 캐시 저장(SQLite 쓰기 + 직렬화) + 응답 녹화"""
+    store_cached(content, phash, response, _vision().AnnotateImageResponse.serialize, base_filename)
+    record_response(content, response)
+
+
+async def google_ocr_async(image: Image.Image, debug: bool = True, base_filename: str = None, source_size: int = None,
+                           deadline=None):
+    """
+    google_ocr 의 asyncio 버전.
+    - Vision 호출은 비동기 gRPC 클라이언트로 보내므로 요청을 기다리는 동안 스레드를 점유하지 않습니다.
+    - 워커당 동시 호출 수는 OCR_MAX_CONCURRENCY 로 제한합니다.
+    - OCR_BATCH_WINDOW_MS 동안 함께 들어온 요청은 OcrBatcher 로 묶어서 보냅니다.
+    - 비동기 클라이언트를 만들 수 없으면 기존 동기 경로(google_ocr)를 스레드에서 실행합니다.
+    - deadline 이 있으면 Vision 응답은 남은 시간까지만 기다립니다.
+    반환 값은 google_ocr 와 같습니다.
+    """
+    try:
+        state = _get_async_state()
+    except Exception as e:
+        logger.warning(f"Async Vision client unavailable, falling back to blocking OCR: {e}")
+        return await asyncio.to_thread(google_ocr, image, debug, base_filename, source_size, deadline)
+
+    try:
+        logger.info(f"OCR started (async): {base_filename}")
+        if deadline is not None:
+            deadline.check("ocr")
+
+        # 전처리(CPU)와 캐시 조회(디스크)는 짧게 스레드에서 처리
+        content, stats, cached = await asyncio.to_thread(_prepare_and_lookup, image, source_size, base_filename)
+        if cached is not None:
+            return cached
+
+        if state["batcher"] is not None:
+            # 비슷한 시점에 들어온 다른 요청과 묶어서 한 번의 RPC 로 전송
+            # (묶음 RPC 는 여러 요청이 공유하므로 이 요청은 남은 시간까지만 기다림)
+            timeout = _ocr_timeout(deadline)   # (submit 코루틴을 만들기 전에 예산 확인)
+            response = await asyncio.wait_for(state["batcher"].submit(content, timeout), timeout)
+        else:
+            # 비동기 클라이언트에는 document_text_detection 헬퍼가 없어 batch 요청 1건으로 보냅니다.
+            async with state["semaphore"]:
+                timeout = _ocr_timeout(deadline)
+                batch = await asyncio.wait_for(
+                    state["client"].batch_annotate_images(requests=[document_text_request(content)], timeout=timeout),
+                    timeout)
+            response = batch.responses[0] if batch.responses else None
+
+        if response:
+            # 저장도 디스크 쓰기이므로 이벤트 루프가 아니라 스레드에서
+            await asyncio.to_thread(_store_and_record, content, stats["phash"], response, base_filename)
+            if debug:
+                logger.info(f"OCR Response completed [{base_filename}]")
+            return response
+        else:
+            logger.warning(f"OCR returned no Response: {base_filename}")
+            return "텍스트를 인식할 수 없습니다."
+    except Exception as e:
+        _note_ocr_failure(deadline)
+        logger.error(f"OCR failed {base_filename} : {str(e)}")
+        return ""
+
+
+def extract_section(image, debug=True, base_filename=None, version=1, source_size=None, deadline=None):
     if (version == 1):
         
         # Google OCR 병렬 처리
-        response = google_ocr(image=image, debug=debug, base_filename=base_filename)
+        response = google_ocr(image=image, debug=debug, base_filename=base_filename, source_size=source_size,
+                              deadline=deadline)
             
         # 3. 텍스트 결합
         return response
     
     else:
-        return print("버전을 다시 확인해 주세요.")
\ No newline at end of file
+        return print("버전을 다시 확인해 주세요.")
+
+
+async def extract_section_async(image, debug=True, base_filename=None, version=1, source_size=None, deadline=None):
+    if (version == 1):
+        return await google_ocr_async(image=image, debug=debug, base_filename=base_filename, source_size=source_size,
+                                      deadline=deadline)
+    else:
+        return print("버전을 다시 확인해 주세요.")
@@ -0,0 +1,98 @@
+# app/verdict_Cache.py
+import os
+import asyncio
+import hashlib
+from .llm_Cache import SectionCache, data_dir
+from .disk_Cache import DiskCache
+from .rule_Registry import get_rule_set
+
+
+# 판정 결과 캐시 설정 (환경변수로 조정)
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "1024"))        # 메모리 항목 수 (0이면 끔)
+VERDICT_CACHE_TTL_S = float(os.getenv("VERDICT_CACHE_TTL_S", "3600"))    # 유효 시간 (초)
+# 디스크 계층: 재시도가 다른 uvicorn 워커로 가도 같은 판정을 쓰도록 워커끼리 공유
+VERDICT_CACHE_DISK = os.getenv("VERDICT_CACHE_DISK", "0") == "1"
+VERDICT_CACHE_PATH = os.getenv("VERDICT_CACHE_PATH", os.path.join(data_dir, "cache", "verdict_cache.sqlite"))
+VERDICT_CACHE_MAX_MB = int(os.getenv("VERDICT_CACHE_MAX_MB", "16"))
+
+
+# 업로드 파일을 해시할 때 한 번에 읽는 크기
+_HASH_CHUNK = 1024 * 1024
+
+
+def verdict_key(fileobj, user_type: str) -> str:
+    """
+    판정 캐시 키 = 업로드 원본 sha256 + 사용자 유형 + 규칙 세트 버전
+    규칙 파일이 바뀌면(버전 변경) 이전 판정은 자동으로 무효가 됩니다.
+    fileobj: 업로드 임시 파일 (조각씩 읽어 해시하므로 원본 전체를 메모리에 올리지 않음, 끝나면 처음으로 되돌림)
+    """
+    rule_version = get_rule_set(user_type).version
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(_HASH_CHUNK), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    image_hash = digest.hexdigest()
+    return hashlib.sha256(f"{image_hash}\0{user_type}\0{rule_version}".encode("utf-8")).hexdigest()
+
+
+def verdict_etag(key: str) -> str:
+    return f'"{key[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 헤더(여러 값, W/ 접두사 허용)에 etag 가 있는지"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+# ----------------------------
+# 같은 키의 동시 요청 합치기 (singleflight)
+# ----------------------------
+class Singleflight:
+    """
+    같은 키로 동시에 들어온 요청은 파이프라인을 한 번만 실행하고 결과를 나눠 가집니다.
+    파이프라인은 별도 Task 로 실행되므로, 처음 요청한 클라이언트가 연결을 끊어도
+    기다리던 다른 요청들은 계속 결과를 받습니다.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._inflight = {}     # key -> asyncio.Task
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, factory):
+        """factory(): 코루틴을 만드는 함수. 반환: (결과, 합쳐진 요청이었는지)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = {}
+
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = loop.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task), coalesced
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+# 판정 결과 저장소는 LLM 섹션 캐시와 같은 구조 (메모리 TTL/LRU + 선택적 SQLite)
+_disk = DiskCache(VERDICT_CACHE_PATH, table="verdicts", max_bytes=VERDICT_CACHE_MAX_MB * 1024 * 1024,
+                ttl=VERDICT_CACHE_TTL_S) if VERDICT_CACHE_DISK else None
+verdict_cache = SectionCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_S, _disk)
+verdict_flight = Singleflight()
+
+
+def verdict_cache_stats() -> dict:
+    return dict(verdict_cache.stats(), singleflight=verdict_flight.stats())
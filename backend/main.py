@@ -1,19 +1,30 @@
 # backend/main.py
-from fastapi import FastAPI, File, UploadFile, Request
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, Request, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from PIL import Image
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 import pillow_heif
-import io
 import json
 import os
+import asyncio
 from starlette.concurrency import run_in_threadpool
 # from app import choice, get_logger_by_name, ban_List, section_text, check_forbidden_ingredients
-from app import (choice, get_logger_by_name, 
-                ban_List, section_text, 
+from app import (choice, choice_async, get_logger_by_name, 
+                ban_List, 
                 process_image_with_google_vision_only,
-                process_image_with_llm)
+                to_layout, OcrLayout,
+                locate_sections_async, match_forbidden, match_caution,
+                record_import, import_report,
+                llm_breaker_stats, section_source_stats, llm_cache_stats, prompt_stats,
+                ocr_cache_stats, ocr_batch_stats, registry_stats,
+                Deadline, DEADLINE_HEADER, check_text,
+                prepare_upload_async, image_pool_stats, ImageWorkerCrashed, peak_rss_mb,
+                UploadLimitMiddleware, MAX_UPLOAD_BYTES,
+                verdict_key, verdict_etag, etag_matches, verdict_cache, verdict_flight, verdict_cache_stats,
+                lookup_ingredient_verdict, store_ingredient_verdict, ingredient_cache_stats)
 
 from datetime import datetime
 import sys
@@ -37,10 +48,32 @@ frontend_dir = os.path.abspath(os.path.join(base_dir, "frontend", "app"))
 static_dir = os.path.abspath(os.path.join(frontend_dir, "static"))
 
 
+# OCR 호출 방식 (1: 비동기 Vision 클라이언트, 0: 기존 스레드풀 + 동기 클라이언트)
+OCR_ASYNC = os.getenv("OCR_ASYNC", "1") == "1"
+# OCR 백엔드 ('google': Google Vision, 'replay': 녹화된 응답 재생 - 오프라인 부하 테스트용)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "google")
+# 여러 장 분석(/Check_Vegan/batch): 한 번에 받을 최대 이미지 수 / 요청 하나에서 동시에 처리할 이미지 수
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "12"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# 텍스트 분석(/Check_Vegan/text): 요청 본문 최대 크기 / 한 번에 받을 최대 항목 수
+TEXT_MAX_BYTES = int(os.getenv("TEXT_MAX_BYTES", str(4 * 1024 * 1024)))
+TEXT_MAX_ITEMS = int(os.getenv("TEXT_MAX_ITEMS", "5000"))
+# 여러 장 분석 요청 전체 본문 최대 크기 (기본: 이미지 1장 한도 x 최대 장수)
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(MAX_UPLOAD_BYTES * BATCH_MAX_IMAGES)))
+
+
 # 등록 (한 번만 해두면 PIL이 HEIC도 열 수 있게 됨)
 pillow_heif.register_heif_opener()
 
 
+# 워커 기동 시 import 시간 보고 (OCR/LLM 클라이언트는 첫 요청 때 생성되므로 여기엔 포함되지 않음)
+record_import("main", _import_started)
+_report = import_report()
+print(f"[STARTUP] pid={_report['pid']} import {_report['total_ms']} ms "
+      f"(budget {_report['budget_ms']} ms{', OVER BUDGET' if _report['over_budget'] else ''}) "
+      f"{_report['timings_ms']} heavy={_report['heavy_modules_loaded']}")
+
+
 app = FastAPI(
     title="VeganLens API",
     description="Upload food label image and check if it's vegan",
@@ -57,6 +90,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 업로드 크기 제한: 본문을 받는 도중 한도를 넘으면 바로 413 (디스크/메모리에 끝까지 받아 두지 않음)
+# 이미지 1장 기본 MAX_UPLOAD_BYTES (환경변수, 기본 20MB)
+app.add_middleware(
+    UploadLimitMiddleware,
+    default_bytes=MAX_UPLOAD_BYTES,
+    limits={
+        "/Check_Vegan/batch": BATCH_MAX_UPLOAD_BYTES,
+        "/Check_Vegan/text": TEXT_MAX_BYTES,
+    },
+)
+
 
 # 정적 파일(css, js 등) mount
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -97,6 +141,30 @@ async def serve_settings():
 async def serve_settings():
     return FileResponse(os.path.join(frontend_dir, "result.html"))
 
+# 워커 상태 확인 API (이 요청을 받은 워커 프로세스 기준)
+@app.get("/status")
+async def status():
+    return JSONResponse(
+        content={
+            "pid": os.getpid(),
+            "llm_circuit": llm_breaker_stats(),     # closed / open / half_open
+            "section_sources": section_source_stats(),
+            "llm_cache": llm_cache_stats(),
+            "llm_prompt": prompt_stats(),
+            "ocr_cache": ocr_cache_stats(),
+            "ocr_batch": ocr_batch_stats(),
+            "image_pool": image_pool_stats(),
+            "verdict_cache": verdict_cache_stats(),
+            "ingredient_cache": ingredient_cache_stats(),
+            "rules": registry_stats(),
+            "startup": import_report(),
+            "peak_rss_mb": peak_rss_mb(),
+            "max_upload_bytes": MAX_UPLOAD_BYTES,
+        },
+        status_code=200,
+    )
+
+
 # 이미지 업로드 API
 @app.post("/Check_Vegan")
 async def analyze_image(request: Request, file: UploadFile = File(...)):
@@ -109,6 +177,10 @@ async def analyze_image(request: Request, file: UploadFile = File(...)):
             status_code=400,  # Bad Request	요청 형식에 문제가 있음 (예: 이미지 안 보냄)
         )
 
+    # 요청 전체 시간 예산 (헤더 x-request-deadline-ms 가 있으면 그 값과 REQUEST_BUDGET_S 중 짧은 쪽)
+    # OCR / LLM / 매칭 각 단계는 남은 시간만 쓰고, 예산이 모자라면 degraded 결과를 돌려줍니다.
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
+
     # 사용자 비건 단계를 프론트엔드에서 넘겨받는다.
     # FastAPI (main.py)에서 읽기
     user_type = request.headers.get("x-user-type", "Vegan")
@@ -122,17 +194,75 @@ async def analyze_image(request: Request, file: UploadFile = File(...)):
     
     ban_list = ban_List(user_type)
 
-    # 1. 이미지 읽기
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents))
+    rss_before = peak_rss_mb()
 
     # 파일명에서 확장자를 제거한 이름 추출
     original_filename = file.filename
     base_filename = os.path.splitext(os.path.basename(original_filename))[0]
+
+    # 1. 이미지 읽기
+    # contents = await file.read()
+    # image = Image.open(io.BytesIO(contents))
+    # 같은 사진 + 같은 사용자 유형 + 같은 규칙 버전이면 저장된 판정을 그대로 돌려줌 (재시도, 중복 탭, 공유 사진)
+    # 키는 업로드 임시 파일을 조각씩 읽어 만들고, 원본 바이트는 파이프라인이 이미지 풀에 넘길 때만 읽습니다.
+    key = await run_in_threadpool(verdict_key, file.file, user_type)
+    etag = verdict_etag(key)
+    headers = {"Idempotency-Key": request.headers.get("idempotency-key") or key}
+    cached = verdict_cache.get(key)
+    if cached is not None:
+        await file.close()
+        print(f"[VERDICT] {base_filename}: cache hit")
+        headers.update({"ETag": etag, "X-Verdict-Cache": "hit"})
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)  # 클라이언트가 가진 결과가 그대로 유효
+        return JSONResponse(content=cached, status_code=200, headers=headers)
+
+    # 같은 사진이 동시에 여러 번 들어오면 OCR -> LLM -> 매칭은 한 번만 실행하고 결과를 나눠 가짐
+    try:
+        (content, stored), coalesced = await verdict_flight.run(
+            key, lambda: _analyze_upload(key, file, base_filename, user_type, use_llm, deadline, rss_before))
+    except ImageWorkerCrashed as e:
+        # 이미지를 디코딩하던 워커 프로세스가 죽음 (깨진/악성 파일): 이 요청만 실패로 돌려줌
+        print(f"[IMAGE_POOL] {base_filename}: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=422, headers=headers)
+    finally:
+        await file.close()
+
+    # ETag 는 같은 키로 다시 물었을 때 같은 본문을 돌려줄 수 있는(캐시에 저장된) 판정에만 붙임
+    if stored:
+        headers["ETag"] = etag
+    headers["X-Verdict-Cache"] = "coalesced" if coalesced else "miss"
+    return JSONResponse(
+        content=content,
+        status_code=200,  # OK 정상 응답 (모든 게 잘 처리됨)
+        headers=headers,
+    )
+
+
+async def _analyze_upload(key, upload, base_filename, user_type, use_llm, deadline, rss_before):
+    """
+    /Check_Vegan 파이프라인 (이미지 준비 -> OCR -> 섹션 찾기 -> 매칭). 반환: (응답 본문 dict, 캐시에 저장했는지)
+    시간 예산 때문에 줄어든 결과(degraded)나 OCR 실패가 아니면 판정 캐시에 저장합니다.
+    """
+    # 디코딩(HEIC 포함), EXIF 보정, 축소, 재인코딩은 이미지 전용 프로세스 풀에서 처리하고
+    # 이 프로세스로는 OCR 에 보낼 작은 JPEG 바이트만 돌아옴 (이벤트 루프/GIL 을 막지 않음)
+    # 원본 바이트는 _prepare_upload 안에서만 잠깐 있고 OCR/LLM 동안에는 들고 있지 않습니다.
+    image, upload_bytes = await _prepare_upload(upload)
+    memory = _memory_stats(image, upload_bytes)
     
     # 2. OCR 수행
     # response = choice(image, debug=True, base_filename=base_filename, version = 1, what='google')
-    response = await run_in_threadpool(choice, image, True, base_filename, 1, 'google')
+    response = await _run_ocr(image, base_filename, upload_bytes, deadline)
+    del image
+    
+    if not response and "ocr_deadline" in deadline.reasons:
+        # 예산 안에 OCR 을 끝내지 못함: 판정할 텍스트가 없으므로 is_vegan 은 알 수 없음(None)
+        print(f"[DEADLINE] {base_filename}: OCR did not finish within {deadline.budget:.1f}s")
+        return _verdict_content(user_type, None, [], [], deadline), False
+    
+    # Vision 응답(protobuf)은 여기서 한 번만 가벼운 레이아웃으로 바꾸고 바로 놓아줍니다.
+    layout = to_layout(response)
+    del response
 
     # 3. 비건 여부 판단
     # text = section_text(response, debug=True, section='ing')
@@ -142,10 +272,15 @@ async def analyze_image(request: Request, file: UploadFile = File(...)):
     
     # found_forbidden = check_forbidden_ingredients(text, ban_list)
 
-    if (use_llm):
-        found_forbidden, found_caution = process_image_with_llm(response, user_type)
+    source = "rules"
+    if not layout.full_text.strip():
+        found_forbidden, found_caution, source = [], [], "empty"
+    elif (use_llm):
+        # 프로세스 공용 AsyncOpenAI 클라이언트 사용 (keep-alive 연결 재사용, 이벤트 루프 블로킹 없음)
+        # (process_image_with_llm_async 와 같은 처리 + 성분 텍스트 캐시. 섹션 출처를 알아야 캐시 저장 여부를 정할 수 있어 풀어서 호출)
+        found_forbidden, found_caution, source = await _judge_layout(layout, user_type, deadline)
     else:
-        found_forbidden, found_caution = process_image_with_google_vision_only(response, user_type)
+        found_forbidden, found_caution = process_image_with_google_vision_only(layout, user_type)
 
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -158,23 +293,371 @@ async def analyze_image(request: Request, file: UploadFile = File(...)):
     logger.info(f"  🚫 감지된 주의 성분: {found_caution if found_caution else '없음'}")
     # logger.info(f"  🔍 OCR 결과: {text}")
     
+    if deadline.degraded:
+        logger.info(f"  ⏱️ 시간 예산 부족으로 축소 처리: {deadline.reasons} ({deadline.elapsed():.2f}s)")
+    
+    _log_memory(logger, base_filename, memory, rss_before)
+
+    content = _verdict_content(user_type, len(found_forbidden) == 0, found_forbidden, found_caution,
+                               deadline, now_str)
+    # OCR 이 글자를 못 읽었거나(empty), LLM 회로가 열려 규칙으로 대신한 결과는 다음 요청에서 다시 시도하도록 저장하지 않음
+    stored = not deadline.degraded and source in CACHEABLE_SOURCES
+    if stored:
+        verdict_cache.set(key, content)
+    return content, stored
+
+
+# 판정을 캐시해도 되는 섹션 출처 (LLM 실패/시간 초과로 규칙 결과로 대신한 경우는 제외)
+CACHEABLE_SOURCES = ("rules", "llm", "text_cache")
+
+
+async def _judge_layout(layout, user_type, deadline):
+    """
+    OCR 레이아웃 -> (found_forbidden, found_caution, source)
+    규칙 기반 섹션으로 성분 텍스트 캐시를 먼저 찾고(거의 같은 라벨이면 LLM/매칭 생략, source="text_cache"),
+    없으면 섹션 찾기(규칙/LLM) + 매칭 후 결과를 캐시에 저장합니다.
+    """
+    cached, key_sections = await run_in_threadpool(lookup_ingredient_verdict, layout, user_type)
+    if cached is not None:
+        print(f"[INGREDIENT_CACHE] hit (similarity {cached['similarity']})")
+        return cached["found_forbidden"], cached["found_caution"], "text_cache"
+
+    sections, source = await locate_sections_async(layout, deadline)
+    found_forbidden = match_forbidden(sections, user_type)
+    found_caution = match_caution(sections, user_type, deadline)
+    if not deadline.degraded and source in ("rules", "llm"):
+        await run_in_threadpool(store_ingredient_verdict, key_sections, user_type, found_forbidden, found_caution)
+    return found_forbidden, found_caution, source
+
+
+async def _run_ocr(image, base_filename, source_size, deadline):
+    if OCR_ASYNC:
+        # 비동기 Vision 클라이언트: 응답을 기다리는 동안 스레드를 점유하지 않음
+        return await choice_async(image, True, base_filename, 1, OCR_BACKEND, source_size, deadline)
+    # 기존 방식: 동기 gRPC 호출을 스레드풀에서 실행
+    return await run_in_threadpool(choice, image, True, base_filename, 1, OCR_BACKEND, source_size, deadline)
+
+
+async def _read_upload(upload: UploadFile) -> bytes:
+    """업로드 파일을 읽고 바로 닫음 (임시 파일 정리)"""
+    try:
+        return await upload.read()
+    finally:
+        await upload.close()
+
+
+async def _prepare_upload(upload: UploadFile):
+    """
+    업로드 파일을 읽어 바로 닫고, 이미지 프로세스 풀에서 OCR 업로드용 바이트로 만듭니다.
+    반환: (PreparedImage, 업로드 바이트 수). 원본 바이트는 풀에 넘긴 뒤 들고 있지 않습니다.
+    """
+    contents = await _read_upload(upload)
+    upload_bytes = len(contents)
+    prepared = await prepare_upload_async(contents)
+    return prepared, upload_bytes
+
+
+def _memory_stats(prepared, upload_bytes: int) -> dict:
+    stats = prepared.stats
+    return {
+        "upload_bytes": upload_bytes,
+        "original_size": "{}x{}".format(*stats["size_before"]),
+        "decoded_size": "{}x{}".format(*stats["size_decoded"]),
+        "decoded_mb": round(stats["decoded_bytes"] / (1024 * 1024), 1),
+    }
+
+
+def _log_memory(logger, base_filename: str, memory: dict, rss_before) -> None:
+    """
+    요청 1건의 메모리 사용 보고 (peak RSS 는 이 프로세스 전체 최고치, +는 이 요청 동안 늘어난 양)
+    디코딩은 이미지 프로세스 풀에서 하므로 decoded 크기는 워커 프로세스 쪽 메모리입니다.
+    """
+    rss_after = peak_rss_mb()
+    peak = f"{rss_after} MB (+{round(rss_after - rss_before, 1)})" if rss_after is not None else "n/a"
+    line = (f"upload {memory['upload_bytes'] / (1024 * 1024):.1f} MB, "
+            f"decoded {memory['original_size']} -> {memory['decoded_size']} ({memory['decoded_mb']} MB), "
+            f"peak RSS {peak}")
+    print(f"[MEMORY] {base_filename}: {line}")
+    logger.info(f"  🧠 메모리: {line}")
+
+
+def _sse(event: str, data: dict) -> str:
+    """Server-Sent Events 메시지 1건"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# 진행 상황 스트리밍 API (Server-Sent Events)
+@app.post("/Check_Vegan/stream")
+async def analyze_image_stream(request: Request, file: UploadFile = File(...)):
+    """
+    /Check_Vegan 과 같은 분석을 하면서 단계별 이벤트를 바로바로 보냅니다.
+    received -> decoded -> ocr_done -> sections_located -> verdict(금지 성분 판정) -> done(최종 결과)
+    - verdict 는 금지 성분 매칭이 끝나는 즉시 보냄 (주의 성분 매칭을 기다리지 않음)
+    - done 의 data 는 /Check_Vegan 응답과 같은 형식
+    - 오류가 나면 error 이벤트를 보내고 끝냄
+    - 클라이언트가 연결을 끊으면 Starlette 가 스트림을 취소하므로 남은 OCR/LLM 단계는 진행하지 않습니다.
+    """
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
+    user_type = request.headers.get("x-user-type", "Vegan")
+    base_filename = os.path.splitext(os.path.basename(file.filename or "upload"))[0]
+
+    def elapsed_ms():
+        return round(deadline.elapsed() * 1000, 1)
+
+    async def events():
+        try:
+            yield _sse("received", {"bytes": file.size, "user_type": user_type,
+                                    "budget_s": deadline.budget, "elapsed_ms": elapsed_ms()})
+
+            image, upload_bytes = await _prepare_upload(file)
+            stats = image.stats
+            yield _sse("decoded", {"width": stats["size_before"][0], "height": stats["size_before"][1],
+                                   "decoded_width": stats["size_decoded"][0], "decoded_height": stats["size_decoded"][1],
+                                   "format": stats["format_in"], "elapsed_ms": elapsed_ms()})
+
+            response = await _run_ocr(image, base_filename, upload_bytes, deadline)
+            del image
+            if not response and "ocr_deadline" in deadline.reasons:
+                yield _sse("done", _verdict_content(user_type, None, [], [], deadline))
+                return
+            layout = to_layout(response)
+            del response
+            yield _sse("ocr_done", {"chars": len(layout.full_text), "elapsed_ms": elapsed_ms()})
+
+            cached, key_sections = None, None
+            if layout.full_text.strip():
+                cached, key_sections = await run_in_threadpool(lookup_ingredient_verdict, layout, user_type)
+            if cached is not None:
+                # 거의 같은 성분 텍스트의 판정이 이미 있음: 섹션 찾기(LLM)와 매칭 생략
+                found_forbidden, found_caution = cached["found_forbidden"], cached["found_caution"]
+                yield _sse("sections_located", {"source": "text_cache", "similarity": cached["similarity"],
+                                                "elapsed_ms": elapsed_ms()})
+                yield _sse("verdict", {"is_vegan": len(found_forbidden) == 0,
+                                       "number_forbidden": len(found_forbidden),
+                                       "found_forbidden": found_forbidden,
+                                       "elapsed_ms": elapsed_ms()})
+                yield _sse("done", _verdict_content(user_type, len(found_forbidden) == 0,
+                                                    found_forbidden, found_caution, deadline))
+                return
+
+            if layout.full_text.strip():
+                sections, source = await locate_sections_async(layout, deadline)
+            else:
+                sections, source = {}, "empty"
+            yield _sse("sections_located", {
+                "source": source,
+                "ingredients_chars": len(sections.get("ingredients_section_text", "")),
+                "caution_chars": len(sections.get("caution_section_text", "")),
+                "elapsed_ms": elapsed_ms(),
+            })
+
+            found_forbidden = match_forbidden(sections, user_type) if sections else []
+            yield _sse("verdict", {"is_vegan": len(found_forbidden) == 0,
+                                   "number_forbidden": len(found_forbidden),
+                                   "found_forbidden": found_forbidden,
+                                   "elapsed_ms": elapsed_ms()})
+
+            found_caution = match_caution(sections, user_type, deadline) if sections else []
+            if not deadline.degraded and source in ("rules", "llm"):
+                await run_in_threadpool(store_ingredient_verdict, key_sections, user_type,
+                                        found_forbidden, found_caution)
+            print(f"[STREAM] {base_filename}: forbidden={found_forbidden} caution={found_caution} "
+                  f"source={source} {elapsed_ms()} ms")
+            yield _sse("done", _verdict_content(user_type, len(found_forbidden) == 0,
+                                                found_forbidden, found_caution, deadline))
+        except Exception as e:
+            print(f"[STREAM] {base_filename}: {type(e).__name__}: {e}")
+            yield _sse("error", {"error": str(e), "elapsed_ms": elapsed_ms()})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 이벤트를 모아서 보내지 않도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# 여러 장 분석 API
+@app.post("/Check_Vegan/batch")
+async def analyze_batch(request: Request, files: list[UploadFile] = File(...),
+                        mode: str = Form("items"), groups: str = Form(None)):
+    """
+    이미지 여러 장을 한 요청으로 분석합니다.
+    - mode="items"  : 각 이미지를 서로 다른 제품으로 판정 (매대 스캔 등)
+    - mode="product": 모든 이미지가 한 제품 (원재료 표가 여러 장에 나뉜 경우) -> 텍스트를 합쳐서 한 번 판정
+    - groups="a,a,b": (선택) 이미지별 제품 이름. 같은 이름끼리 합쳐서 판정 (mode 보다 우선)
+    OCR 은 BATCH_CONCURRENCY 장씩 동시에 진행하고, 시간 예산(deadline)은 요청 전체에 하나입니다.
+    응답: products(제품별 판정) + items(이미지별 OCR 결과) + combined(전체 요약)
+    """
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
+    user_type = request.headers.get("x-user-type", "Vegan")
+
+    if not files:
+        return JSONResponse(content={"error": "Image is required"}, status_code=400)
+    if len(files) > BATCH_MAX_IMAGES:
+        return JSONResponse(content={"error": f"Too many images (max {BATCH_MAX_IMAGES})"}, status_code=400)
+
+    # 이미지별 제품 이름
+    if groups:
+        labels = [label.strip() for label in groups.split(",")]
+        if len(labels) != len(files) or not all(labels):
+            return JSONResponse(content={"error": "groups must name every image"}, status_code=400)
+    elif mode == "product":
+        labels = ["product"] * len(files)
+    elif mode == "items":
+        labels = [str(idx) for idx in range(len(files))]
+    else:
+        return JSONResponse(content={"error": "mode must be 'items' or 'product'"}, status_code=400)
+
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def ocr_one(idx, upload):
+        base_filename = os.path.splitext(os.path.basename(upload.filename or f"image{idx}"))[0]
+        item = {"index": idx, "filename": upload.filename, "group": labels[idx]}
+        async with semaphore:
+            try:
+                image, upload_bytes = await _prepare_upload(upload)
+                layout = to_layout(await _run_ocr(image, base_filename, upload_bytes, deadline))
+                del image
+            except Exception as e:
+                print(f"[BATCH] {base_filename}: {type(e).__name__}: {e}")
+                item.update(ocr_ok=False, chars=0, error=str(e))
+                return item, OcrLayout()
+        item.update(ocr_ok=bool(layout.full_text.strip()), chars=len(layout.full_text))
+        return item, layout
+
+    results = await asyncio.gather(*(ocr_one(idx, upload) for idx, upload in enumerate(files)))
+    items = [item for item, _ in results]
+
+    # 제품별로 레이아웃을 (업로드 순서대로) 합치기
+    grouped = {}
+    for item, layout in results:
+        grouped.setdefault(item["group"], []).append((item, layout))
+
+    async def judge(label, members):
+        layout = OcrLayout.concat([layout for _, layout in members])
+        product = {"group": label, "files": [item["filename"] for item, _ in members]}
+        if not layout.full_text.strip():
+            # 판정할 텍스트가 없음 (OCR 실패/시간 초과)
+            product.update(is_vegan=None, number_forbidden=0, found_forbidden=[],
+                           is_caution=True, number_caution=0, found_caution=[], source=None)
+            return product
+        async with semaphore:
+            found_forbidden, found_caution, source = await _judge_layout(layout, user_type, deadline)
+        product.update(is_vegan=len(found_forbidden) == 0,
+                       number_forbidden=len(found_forbidden), found_forbidden=found_forbidden,
+                       is_caution=len(found_caution) == 0,
+                       number_caution=len(found_caution), found_caution=found_caution,
+                       source=source)
+        return product
+
+    products = await asyncio.gather(*(judge(label, members) for label, members in grouped.items()))
+
+    all_forbidden = sorted({kw for product in products for kw in product["found_forbidden"]})
+    print(f"[BATCH] {len(files)} image(s), {len(products)} product(s), forbidden={all_forbidden}, "
+          f"{deadline.elapsed():.2f}s")
     return JSONResponse(
         content={
-            "Date": now_str,
+            "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "user_type": user_type,
-            "is_vegan": len(found_forbidden) == 0, # True : 비건,  False : 비건 아님
-            "number_forbidden": len(found_forbidden),
-            "found_forbidden": found_forbidden,
-            
-            "is_caution": len(found_caution) == 0,
-            "number_caution": len(found_caution),
-            "found_caution": found_caution,
-            # "ocr_text": text,
+            "mode": "groups" if groups else mode,
+            "count": len(files),
+            "products": products,
+            "items": items,
+            "combined": {
+                # 판정된 제품이 모두 비건이면 True, 판정 불가(None) 제품이 있으면 None
+                "all_vegan": (None if any(p["is_vegan"] is None for p in products)
+                              else all(p["is_vegan"] for p in products)),
+                "non_vegan": [p["group"] for p in products if p["is_vegan"] is False],
+                "unknown": [p["group"] for p in products if p["is_vegan"] is None],
+                "found_forbidden": all_forbidden,
+            },
+            "degraded": deadline.degraded,
+            "degraded_reason": ",".join(deadline.reasons) or None,
         },
-        status_code=200,  # OK 정상 응답 (모든 게 잘 처리됨)
+        status_code=200,
     )
 
 
+# 텍스트 분석 API (OCR / LLM 없이 규칙만)
+@app.post("/Check_Vegan/text")
+async def analyze_text(request: Request):
+    """
+    이미 가지고 있는 원재료 텍스트로 판정합니다. 응답 항목은 /Check_Vegan 과 같은 형식입니다.
+    - JSON 객체 1개   : {"ingredients_text": "...", "caution_text": "...(선택)", "user_type": "Vegan(선택)"} -> 객체 1개
+    - JSON 배열       : 위 객체들의 리스트 -> 같은 순서의 결과 리스트
+    - NDJSON          : Content-Type application/x-ndjson, 한 줄에 객체 1개 -> 한 줄에 결과 1개
+    user_type 이 없으면 x-user-type 헤더(기본 Vegan)를 사용합니다. 잘못된 항목은 그 자리에 {"error": ...}
+    """
+    default_user_type = request.headers.get("x-user-type", "Vegan")
+    body = await request.body()
+    if len(body) > TEXT_MAX_BYTES:
+        return JSONResponse(content={"error": f"Body too large (max {TEXT_MAX_BYTES} bytes)"}, status_code=413)
+
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    try:
+        if ndjson:
+            payload = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return JSONResponse(content={"error": f"Invalid JSON: {e}"}, status_code=400)
+
+    single = isinstance(payload, dict)
+    items = [payload] if single else payload
+    if not isinstance(items, list):
+        return JSONResponse(content={"error": "Expected a JSON object or a list of objects"}, status_code=400)
+    if len(items) > TEXT_MAX_ITEMS:
+        return JSONResponse(content={"error": f"Too many items (max {TEXT_MAX_ITEMS})"}, status_code=400)
+
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    results = [_text_verdict(item, default_user_type, now_str) for item in items]
+
+    if single:
+        status_code = 400 if "error" in results[0] else 200
+        return JSONResponse(content=results[0], status_code=status_code)
+    if ndjson:
+        lines = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        return Response(content=lines, media_type="application/x-ndjson")
+    return JSONResponse(content=results, status_code=200)
+
+
+def _text_verdict(item, default_user_type: str, now_str: str) -> dict:
+    if not isinstance(item, dict):
+        return {"error": "Each item must be a JSON object"}
+    ingredients_text = item.get("ingredients_text")
+    caution_text = item.get("caution_text")
+    if not isinstance(ingredients_text, str) or not ingredients_text.strip():
+        return {"error": "ingredients_text is required"}
+    if caution_text is not None and not isinstance(caution_text, str):
+        return {"error": "caution_text must be a string"}
+
+    user_type = item.get("user_type") or default_user_type
+    if not isinstance(user_type, str):
+        return {"error": "user_type must be a string"}
+    found_forbidden, found_caution = check_text(ingredients_text, caution_text, user_type)
+    return _verdict_content(user_type, len(found_forbidden) == 0, found_forbidden, found_caution, None, now_str)
+
+
+def _verdict_content(user_type, is_vegan, found_forbidden, found_caution, deadline, now_str=None):
+    """/Check_Vegan 응답 본문. degraded 가 True 면 시간 예산 때문에 일부 단계를 건너뛴 결과입니다."""
+    return {
+        "Date": now_str or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "user_type": user_type,
+        "is_vegan": is_vegan, # True : 비건,  False : 비건 아님, None : 판정 불가 (OCR 시간 초과)
+        "number_forbidden": len(found_forbidden),
+        "found_forbidden": found_forbidden,
+        
+        "is_caution": len(found_caution) == 0,
+        "number_caution": len(found_caution),
+        "found_caution": found_caution,
+        # "ocr_text": text,
+        
+        "degraded": deadline.degraded if deadline is not None else False,
+        "degraded_reason": (",".join(deadline.reasons) or None) if deadline is not None else None,
+    }
+
+
 
 # app = FastAPI(...) 정의 ‘아래쪽 아무데나’ (runner 전) 추가
 if getattr(sys, "frozen", False):
@@ -205,6 +688,8 @@ if __name__ == "__main__":
     BACKLOG    = int(os.getenv("UVICORN_BACKLOG", "512"))
     KEEP_ALIVE = int(os.getenv("UVICORN_KEEPALIVE", "5"))
     LOG_LEVEL  = os.getenv("UVICORN_LOG_LEVEL", "info")
+    # 워커 프로세스들이 같은 호스트의 워커 수를 알도록 (이미지 처리 풀 크기를 워커 수로 나눠 정함)
+    os.environ["UVICORN_WORKERS"] = str(WORKERS)
 
     # 브라우저 자동 오픈(포트 열리면)
     threading.Thread(
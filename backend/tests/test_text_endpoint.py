@@ -0,0 +1,36 @@
+# backend/tests/test_text_endpoint.py
+# /Check_Vegan/text 항목 검증 (OCR / LLM 없이 규칙만 사용하므로 외부 서비스 불필요)
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+client = TestClient(main.app)
+
+
+def test_non_string_user_type_fails_only_that_item():
+    items = [
+        {"ingredients_text": "원재료명: 밀가루, 우유, 설탕", "user_type": ["Vegan"]},
+        {"ingredients_text": "원재료명: 밀가루, 우유, 설탕", "user_type": {"type": "Vegan"}},
+        {"ingredients_text": "원재료명: 밀가루, 우유, 설탕"},
+    ]
+    r = client.post("/Check_Vegan/text", json=items)
+
+    assert r.status_code == 200
+    results = r.json()
+    assert results[0] == {"error": "user_type must be a string"}
+    assert results[1] == {"error": "user_type must be a string"}
+    assert results[2]["user_type"] == "Vegan"
+    assert results[2]["found_forbidden"] == ["milk"]
+
+
+def test_non_string_user_type_single_object_is_400():
+    r = client.post("/Check_Vegan/text", json={"ingredients_text": "원재료명: 밀가루", "user_type": 3})
+
+    assert r.status_code == 400
+    assert r.json() == {"error": "user_type must be a string"}
@@ -351,7 +351,9 @@ function sendImageToBackend(imageFile) {
   fetch(SERVER_URL, {
     method: "POST",
     headers: {
-      "x-user-type": vegType
+      "x-user-type": vegType,
+      // 서버 처리 시간 예산 (ms). 30초 타임아웃 전에 축소된(degraded) 결과라도 받도록 여유를 둠
+      "x-request-deadline-ms": "25000"
     },
     body: formData,
     signal: uploadController.signal